@@ -2,81 +2,248 @@ import sys
 import threading
 import time
 import multiprocessing
-from PyQt6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
-from PyQt6.QtGui import QIcon, QAction
 
 # Adjust path to ensure imports work both in dev and compiled mode
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.backend.main import start_backend
-from src.frontend.floating_ball import FloatingBall
-from src.frontend.task_window import TaskWindow
+# First of our imports: the startup trace counts from here
+from src.shared.startup_trace import mark
+
+instance = None
+launch_command = None
+if __name__ == "__main__":
+    # Before anything else: in a frozen build the backend child process re-runs this file,
+    # and must not take part in the single-instance check below
+    multiprocessing.freeze_support()
+    # A second launch hands its command to the running instance and exits before Qt is imported
+    from src.shared.instance import CLAIM_ATTEMPTS, CLAIM_RETRY_DELAY, InstanceServer, command_from_argv, forward_command
+    launch_command = command_from_argv(sys.argv[1:])
+    instance = InstanceServer()
+    try:
+        for _ in range(CLAIM_ATTEMPTS):
+            if forward_command(launch_command):
+                sys.exit(0)
+            if instance.claim():
+                break
+            # Held by an instance that did not take the command: it is shutting down,
+            # or started at the same moment and is about to answer
+            time.sleep(CLAIM_RETRY_DELAY)
+        else:
+            print("Error: another instance holds the single-instance address but does not answer")
+            sys.exit(1)
+    except OSError as e:
+        print(f"Error claiming the single-instance address, continuing without it: {e}")
+        instance = None
+
 from src.shared.paths import get_asset_path
+from src.shared.config import BACKEND_MODE, SERVE_HTTP, BACKEND_READY_TIMEOUT_MS
+
+# Build the panel this long after the ball is up, unless the ball is clicked first
+PANEL_PREBUILD_DELAY_MS = 300
 
 def run_backend():
-    # Disable signal handling in uvicorn when running in a thread
-    # to avoid conflict with PyQt or main thread signals
-    # However, uvicorn.run doesn't have a simple flag for that in the convenience function
-    # but running it in a thread usually works if we don't need graceful shutdown via signals.
-    start_backend(port=8000)
+    # uvicorn skips installing signal handlers outside the main thread,
+    # so shutdown goes through stop_backend() instead of signals.
+    # Transport (Unix socket or TCP) and port come from src/shared/config.py
+    from src.backend.main import start_backend
+    start_backend()
+
+class BackendStarter:
+    """
+    在后台线程中导入并启动后端（加载数据；http 模式下启动 uvicorn 并等待就绪；
+    process 模式下启动受监护的后端子进程），不占用界面线程
+    """
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.url = None
+        self.service = None
+        self.http_thread = None
+        self.supervisor = None
+        self.thread = threading.Thread(target=self._run, name="floatdo-startup", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        try:
+            if BACKEND_MODE == "process":
+                # The child process owns the data files; this process never loads the service
+                from src.backend.supervisor import BackendSupervisor
+                self.supervisor = BackendSupervisor()
+                self.url = self.supervisor.start()
+                mark("backend ready")
+                return
+            from src.backend.service import get_service
+            self.service = get_service()
+            # In embedded mode the UI calls the service directly,
+            # and the HTTP server only runs when external clients need it
+            if BACKEND_MODE == "embedded":
+                self.service.start()
+            if BACKEND_MODE != "embedded" or SERVE_HTTP:
+                self.http_thread = threading.Thread(target=run_backend, daemon=True)
+                self.http_thread.start()
+            if BACKEND_MODE != "embedded":
+                from src.backend.main import wait_for_backend
+                self.url = wait_for_backend(BACKEND_READY_TIMEOUT_MS / 1000)
+                if self.url is None:
+                    print(f"Error starting backend: not ready after {BACKEND_READY_TIMEOUT_MS} ms")
+            mark("backend ready")
+        except Exception as e:
+            print(f"Error starting backend: {e}")
+        finally:
+            self.ready.set()
+
+    def stop(self):
+        """
+        正常停止 uvicorn，再写出排队的变更；启动尚未完成时先等它结束
+        """
+        if self.thread.is_alive():
+            self.thread.join(timeout=BACKEND_READY_TIMEOUT_MS / 1000)
+        if self.supervisor is not None:
+            self.supervisor.stop()
+        if self.http_thread is not None:
+            from src.backend.main import stop_backend
+            stop_backend()
+            self.http_thread.join(timeout=5)
+        if self.service is not None:
+            self.service.stop()
 
 def main():
-    # 1. Multiprocessing support for Nuitka/Windows
-    multiprocessing.freeze_support()
+    # 1. Multiprocessing support for Nuitka/Windows runs at import time, before the single-instance check.
+    # Qt is imported here, not at the top: a spawned backend process re-runs this file's
+    # top level (as __mp_main__) and would otherwise load the GUI on every start and restart.
+    # Only what the floating ball needs is imported up front; the backend, httpx and the
+    # task panel are imported in the background or on first use
+    from PyQt6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
+    from PyQt6.QtGui import QIcon, QAction
+    from PyQt6.QtCore import Qt, QTimer, QObject, pyqtSignal
+    from src.frontend.floating_ball import FloatingBall
 
-    # 2. Start Backend in a separate thread
-    backend_thread = threading.Thread(target=run_backend, daemon=True)
-    backend_thread.start()
+    class CommandBridge(QObject):
+        """
+        把后续启动转发来的命令从监听线程交给界面线程处理
+        """
+        received = pyqtSignal(dict)
 
-    # Give backend a moment to start (optional, but helps avoid initial connection error)
-    time.sleep(1)
+    mark("imports done")
 
-    # 3. Start PyQt Application
+    # 2. Start PyQt Application
     app = QApplication(sys.argv)
-    
+
     # Set App Icon
     icon_path = get_asset_path('icon.png')
     app_icon = QIcon(icon_path)
     app.setWindowIcon(app_icon)
-    
+
     # Prevent the app from quitting when the last window is closed
     # because we want the floating ball to persist even if task window is closed
     app.setQuitOnLastWindowClosed(False)
+    mark("qt app created")
 
-    # 4. Initialize Windows
-    task_window = TaskWindow()
+    # 3. The floating ball goes up first; everything else happens after it has painted
     ball = FloatingBall()
+    ball.show()
+    mark("ball shown")
+
+    backend = BackendStarter()
+
+    def on_first_idle():
+        # Runs once the event loop is up, after the ball's first paint
+        mark("event loop running")
+        backend.start()
+
+    QTimer.singleShot(0, on_first_idle)
+
+    # 4. Task panel, built on first click or once the app is idle
+    panel = {"window": None}
+
+    def get_task_window():
+        if panel["window"] is None:
+            # A click that beats the backend waits for it, bounded like the startup wait
+            if not backend.ready.wait(BACKEND_READY_TIMEOUT_MS / 1000):
+                print(f"Error starting backend: not ready after {BACKEND_READY_TIMEOUT_MS} ms")
+            from src.frontend.task_window import TaskWindow
+            from src.frontend.api_client import create_api_client
+            panel["window"] = TaskWindow(create_api_client(backend.url))
+            mark("panel built")
+        return panel["window"]
+
+    def prebuild_panel():
+        if panel["window"] is not None:
+            return
+        if not backend.ready.is_set():
+            QTimer.singleShot(50, prebuild_panel)
+            return
+        get_task_window()
+
+    QTimer.singleShot(PANEL_PREBUILD_DELAY_MS, prebuild_panel)
 
     # 5. Connect Ball Click to Task Window
     def show_tasks():
+        task_window = get_task_window()
         task_window.show()
         task_window.activateWindow() # Bring to front
         task_window.refresh_tasks()  # Refresh data
 
     ball.clicked_callback = show_tasks
-    ball.show()
-    
+
+    def add_task_text(title):
+        task_window = get_task_window()
+        if not task_window.task_input.isEnabled():
+            # An add is still in flight; try again once it has finished
+            QTimer.singleShot(100, lambda: add_task_text(title))
+            return
+        task_window.task_input.setText(title)
+        task_window.add_task()
+
+    def handle_command(command):
+        # Commands can arrive while the backend is still starting; wait for it without blocking
+        if not backend.ready.is_set():
+            QTimer.singleShot(50, lambda: handle_command(command))
+            return
+        show_tasks()
+        if command.get("command") == "add":
+            add_task_text(command.get("title", ""))
+
+    # Commands from later launches ("show" or "add" with the text from their command line).
+    # Always queued, so the ones received during startup run from the event loop too
+    bridge = CommandBridge()
+    bridge.received.connect(handle_command, Qt.ConnectionType.QueuedConnection)
+    if instance is not None:
+        instance.serve(bridge.received.emit)
+
+    # Task text given to this first launch
+    if launch_command is not None and launch_command["command"] == "add":
+        QTimer.singleShot(0, lambda: handle_command(launch_command))
+
     # 6. System Tray Icon
     tray_icon = QSystemTrayIcon(app)
     tray_icon.setIcon(app_icon)
-    
+
     # Tray Menu
     tray_menu = QMenu()
-    
+
     show_action = QAction("显示悬浮球", app)
     show_action.triggered.connect(ball.show)
     tray_menu.addAction(show_action)
-    
+
     tray_menu.addSeparator()
-    
+
     quit_action = QAction("退出", app)
     quit_action.triggered.connect(app.quit)
     tray_menu.addAction(quit_action)
-    
+
+    # Stop taking commands from new launches first, so they start their own instance instead
+    if instance is not None:
+        app.aboutToQuit.connect(instance.close)
+    # Stop uvicorn gracefully, then flush queued writes before the process exits
+    app.aboutToQuit.connect(backend.stop)
+
     tray_icon.setContextMenu(tray_menu)
     tray_icon.show()
-    
+
     # 7. Run Event Loop
     sys.exit(app.exec())
 
@@ -0,0 +1,85 @@
+import gzip
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+
+class TaskArchive:
+    """
+    归档层：完成已久的任务移出内存热数据，追加写入 gzip 压缩的 NDJSON 段文件。
+    每次归档追加一个新的 gzip 段，读取时按需流式解压，启动时不加载
+    """
+
+    def __init__(self, archive_file: str):
+        self.archive_file = archive_file
+        self.lock = threading.Lock()
+
+    def append(self, tasks: List[Dict[str, Any]]):
+        if not tasks:
+            return
+        data = "".join(json.dumps(t, ensure_ascii=False, separators=(',', ':')) + "\n" for t in tasks)
+        with self.lock:
+            os.makedirs(os.path.dirname(self.archive_file), exist_ok=True)
+            # Concatenated gzip members form one valid gzip stream
+            with open(self.archive_file, 'ab') as f:
+                f.write(gzip.compress(data.encode('utf-8')))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def iter_tasks(self, list_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.archive_file):
+            return
+        with gzip.open(self.archive_file, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    task = json.loads(line)
+                except ValueError:
+                    continue
+                if list_id is None or task.get("list_id") == list_id:
+                    yield task
+
+    def browse(self, list_id: Optional[str] = None, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        items = []
+        index = -1
+        with self.lock:
+            for index, task in enumerate(self.iter_tasks(list_id)):
+                if index < offset:
+                    continue
+                if len(items) == limit:
+                    return {"tasks": items, "next_offset": offset + limit}
+                items.append(task)
+        return {"tasks": items, "next_offset": None}
+
+    def take(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        从归档中取出一个任务（恢复时使用），需要重写归档文件，只在用户操作时发生
+        """
+        with self.lock:
+            taken = self._remove(lambda task: task.get("id") == task_id, 1)
+        return taken[0] if taken else None
+
+    def discard(self, task_ids: Set[str]) -> int:
+        """
+        删除这些 id 的归档副本（写入归档期间又被修改、仍留在热数据中的任务），返回删除的条数
+        """
+        if not task_ids:
+            return 0
+        with self.lock:
+            return len(self._remove(lambda task: task.get("id") in task_ids))
+
+    def _remove(self, match: Callable[[Dict[str, Any]], bool], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Rewrites the whole file; the caller holds the lock
+        removed = []
+        tmp_path = self.archive_file + ".tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as out:
+            for task in self.iter_tasks():
+                if (limit is None or len(removed) < limit) and match(task):
+                    removed.append(task)
+                    continue
+                out.write(json.dumps(task, ensure_ascii=False, separators=(',', ':')) + "\n")
+        if not removed:
+            os.remove(tmp_path)
+            return removed
+        os.replace(tmp_path, self.archive_file)
+        return removed
@@ -0,0 +1,41 @@
+import json
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+def encode_json(data: Any) -> bytes:
+    # Same output as FastAPI's JSONResponse
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+class ResponseCache:
+    """
+    已编码响应体的缓存：每个键只保留一份，并记录生成时的 revision。
+    revision 变化即视为失效，未变化的轮询直接返回缓存的字节，不再序列化
+    """
+
+    def __init__(self):
+        self.entries: Dict[Hashable, Tuple[Tuple[str, int], bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: Tuple[str, int]) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, version: Tuple[str, int], body: bytes):
+        self.entries[key] = (version, body)
+
+    def discard(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "bytes": sum(len(body) for _, body in self.entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,78 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set
+
+# Events a slow subscriber may fall behind by before it is told to resync instead
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class EventHub:
+    """
+    变更推送：每个 SSE 连接一个队列，存储层每次修改都向所有连接发布一条事件
+    """
+
+    def __init__(self):
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, event: Dict[str, Any]):
+        if not self.subscribers or self.loop is None or self.loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._deliver(event)
+        else:
+            # Mutations made outside the event loop thread
+            self.loop.call_soon_threadsafe(self._deliver, event)
+
+    def close(self):
+        """
+        结束所有推送连接（关闭服务前调用，否则长连接会拖住 uvicorn 的退出）
+        """
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self._deliver, None)
+
+    def _deliver(self, event: Optional[Dict[str, Any]]):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The client fell behind: replace its backlog with one resync request
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"kind": "resync"} if event is not None else None)
+
+    async def stream(self, hello: Dict[str, Any]):
+        """
+        SSE 数据流：先发送 hello（当前 epoch / revision），之后每次变更一条 change 事件。
+        没有变更时不发送任何数据
+        """
+        queue = self.subscribe()
+        try:
+            yield _format_sse("hello", hello)
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield _format_sse("change", event)
+        finally:
+            self.unsubscribe(queue)
+
+
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
@@ -1,174 +1,533 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-import json
+from typing import Dict, List, Literal, Optional
+import asyncio
+import base64
 import os
+import socket
+import sys
+import threading
+import time
 import uvicorn
 from contextlib import asynccontextmanager
 
 # Import path utility
 try:
-    from src.shared.paths import get_data_path
+    from src.shared.config import BACKEND_HOST, BACKEND_PORT, SOCKET_FILE, USE_UNIX_SOCKET
+    from src.shared.startup_trace import marks as startup_marks
+    from src.backend.service import ServiceError, get_service
+    from src.backend.events import EventHub
+    from src.backend.transfer import IMPORT_CHUNK_SIZE, ImportReport, decode_record, export_lines
+    from src.backend.cache import ResponseCache, encode_json
+    from src.backend.metrics import LatencyHistogram, LoopMonitor, rss_bytes
 except ImportError:
-    import sys
     sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-    from src.shared.paths import get_data_path
+    from src.shared.config import BACKEND_HOST, BACKEND_PORT, SOCKET_FILE, USE_UNIX_SOCKET
+    from src.shared.startup_trace import marks as startup_marks
+    from src.backend.service import ServiceError, get_service
+    from src.backend.events import EventHub
+    from src.backend.transfer import IMPORT_CHUNK_SIZE, ImportReport, decode_record, export_lines
+    from src.backend.cache import ResponseCache, encode_json
+    from src.backend.metrics import LatencyHistogram, LoopMonitor, rss_bytes
 
-# Data Model
+# Data Model (request validation and API schema; the store keeps compact records)
 class Task(BaseModel):
     id: str
     title: str
     completed: bool = False
     list_id: str = "default" # New field for list association
+    completed_at: Optional[float] = None # Set by the server when the task is checked off
 
 class TaskList(BaseModel):
     id: str
     name: str
 
-# Global state
-tasks: List[Task] = []
-task_lists: List[TaskList] = []
+class TaskPatch(BaseModel):
+    # Only the fields present in the request body are changed
+    title: Optional[str] = None
+    completed: Optional[bool] = None
+    list_id: Optional[str] = None
 
-DATA_FILE = get_data_path('tasks.json')
-LISTS_FILE = get_data_path('lists.json')
+class BatchOp(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[str] = None # Target task for update/delete
+    task: Optional[Task] = None # Full task for create/update
 
-def load_data():
-    global tasks, task_lists
-    # Load Tasks
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                tasks = [Task(**item) for item in data]
-        except Exception as e:
-            print(f"Error loading tasks: {e}")
-            tasks = []
-    else:
-        tasks = []
-        
-    # Load Lists
-    if os.path.exists(LISTS_FILE):
-        try:
-            with open(LISTS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                task_lists = [TaskList(**item) for item in data]
-        except Exception as e:
-            print(f"Error loading lists: {e}")
-            task_lists = [TaskList(id="default", name="今日任务")]
-    else:
-        # Default list
-        task_lists = [TaskList(id="default", name="今日任务")]
-        save_lists()
-
-def save_tasks():
-    try:
-        os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump([t.model_dump() for t in tasks], f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving tasks: {e}")
+class BatchRequest(BaseModel):
+    ops: List[BatchOp]
 
-def save_lists():
-    try:
-        os.makedirs(os.path.dirname(LISTS_FILE), exist_ok=True)
-        with open(LISTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump([l.model_dump() for l in task_lists], f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving lists: {e}")
+# Business logic lives in the service layer; this module only adds HTTP on top of it.
+# The desktop app calls the same service instance directly (see src/frontend/local_client.py).
+service = get_service()
+store = service.store
+
+hub = EventHub()
+service.add_listener(hub.publish)
+
+async def call(method, *args):
+    # Store access runs on the service's writer thread; the event loop only awaits the result,
+    # so a slow write or a lazy list load never stalls other requests
+    return await asyncio.wrap_future(service.submit(method, *args))
+
+# Encoded bodies of the hot read endpoints, reused until the revision they were built at moves
+response_cache = ResponseCache()
+
+# --- Metrics ---
+
+STARTED_AT = time.time()
+# PRD acceptance budgets (section 九)
+BUDGETS = {"operation_ms": 100, "memory_mb": 150, "startup_s": 3, "idle_cpu_percent": 3}
+
+# "METHOD /route/{param}" -> latency to the first response byte, and 5xx count
+route_latency: Dict[str, LatencyHistogram] = {}
+route_errors: Dict[str, int] = {}
+loop_monitor = LoopMonitor()
+
+class MetricsMiddleware:
+    """
+    纯 ASGI 中间件：记录每个路由到响应开始的耗时（流式响应如 /events 只计首包），开销为一次计时和一次直方图计数
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                # The router has matched by now; unmatched paths share one key so the map stays bounded
+                route = scope.get("route")
+                key = f"{scope['method']} {route.path}" if route is not None else "unmatched"
+                histogram = route_latency.get(key)
+                if histogram is None:
+                    histogram = route_latency[key] = LatencyHistogram()
+                histogram.observe((time.perf_counter() - start) * 1000)
+                if message["status"] >= 500:
+                    route_errors[key] = route_errors.get(key, 0) + 1
+            await send(message)
+
+        await self.app(scope, receive, send_timed)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    load_data()
+    hub.bind(asyncio.get_running_loop())
+    # In embedded mode the desktop app has started the service already and stops it itself
+    owns_service = service.start()
+    loop_monitor.start()
     yield
-    save_tasks()
-    save_lists()
+    loop_monitor.stop()
+    hub.close()
+    if owns_service:
+        # Always write out whatever is still queued, off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, service.stop)
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(ServiceError)
+async def service_error_handler(request: Request, exc: ServiceError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
 
 # --- List Endpoints ---
 
+def make_etag(revision: int) -> str:
+    # Strong validator: revisions only move forward within one epoch
+    return f'"{store.epoch}-{revision}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return any(tag.strip() in (etag, "*") for tag in header.split(","))
+
 @app.get("/lists", response_model=List[TaskList])
-async def get_lists():
-    return task_lists
+async def get_lists(request: Request, with_counts: bool = False):
+    """
+    with_counts=true 时每个清单附带 open / completed 任务数（增量维护的计数器，不扫描任务）
+    """
+    # Counts move with every task change, the plain list only with list changes
+    revision = store.revision if with_counts else store.lists_revision
+    etag = make_etag(revision)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    key = ("lists", with_counts)
+    version = (store.epoch, revision)
+    body = response_cache.get(key, version)
+    if body is None:
+        # A snapshot made for in-process callers saves the writer round trip; otherwise build one
+        # without keeping it, the encoded body below is this endpoint's only cached copy
+        lists = service.cached_lists(with_counts)
+        if lists is None:
+            lists = await call(service.build_lists, with_counts, False)
+        # Records are already valid, so skip response_model validation and encode them directly
+        body = encode_json(lists)
+        response_cache.put(key, version, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 @app.post("/lists", response_model=TaskList)
 async def create_list(task_list: TaskList):
-    for l in task_lists:
-        if l.id == task_list.id:
-            raise HTTPException(status_code=400, detail="List ID already exists")
-    task_lists.append(task_list)
-    save_lists()
-    return task_list
+    return await call(service.create_list, task_list.model_dump())
 
 @app.delete("/lists/{list_id}")
 async def delete_list(list_id: str):
-    global task_lists, tasks
-    
-    # Prevent deleting the default list if needed (optional, but good practice)
-    # However, if user wants to delete it, maybe we should allow it but ensure a default always exists.
-    # For now, let's assume "default" list ID is "default" and cannot be deleted.
-    if list_id == "default":
-        raise HTTPException(status_code=400, detail="Cannot delete default list")
-        
-    # Find list
-    list_to_delete = next((l for l in task_lists if l.id == list_id), None)
-    if not list_to_delete:
-        raise HTTPException(status_code=404, detail="List not found")
-        
-    # Delete list
-    task_lists = [l for l in task_lists if l.id != list_id]
-    
-    # Delete associated tasks
-    tasks = [t for t in tasks if t.list_id != list_id]
-    
-    save_lists()
-    save_tasks()
+    await call(service.delete_list, list_id)
+    response_cache.discard(("tasks", list_id))
     return {"status": "success"}
 
 # --- Task Endpoints ---
 
+def encode_cursor(query: str, key) -> str:
+    raw = f"{store.epoch}:{query}:{key[0]}:{key[1]}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, query: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        # The epoch is hex and the key two ints, but the query holds a list id that may contain ":"
+        epoch, rest = raw.split(":", 1)
+        cursor_query, tag, position = rest.rsplit(":", 2)
+        key = (int(tag), int(position))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Positions only mean something within one process, and only for the query they came from
+    if epoch != store.epoch or cursor_query != query:
+        raise HTTPException(status_code=400, detail="Cursor expired")
+    return key
+
 @app.get("/tasks", response_model=List[Task])
-async def get_tasks(list_id: Optional[str] = None):
-    if list_id:
-        return [t for t in tasks if t.list_id == list_id]
-    return tasks
+async def get_tasks(
+    request: Request,
+    list_id: Optional[str] = None,
+    completed: Optional[bool] = None,
+    order: Literal["created", "open_first"] = "created",
+    desc: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """
+    completed 过滤、order 排序（created 创建顺序 / open_first 未完成在前）、desc 倒序、limit + cursor 分页。
+    都由维护好的索引直接给出，不在请求时排序；还有下一页时在 X-Next-Cursor 头中返回游标
+    """
+    revision = store.list_revision(list_id) if list_id else store.revision
+    etag = make_etag(revision)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    paged = completed is not None or order != "created" or desc or limit is not None or cursor is not None
+    if not paged:
+        key = ("tasks", list_id)
+        version = (store.epoch, revision)
+        body = response_cache.get(key, version)
+        if body is None:
+            tasks = service.cached_tasks(list_id)
+            if tasks is None:
+                tasks = await call(service.build_tasks, list_id, False)
+            body = encode_json(tasks)
+            response_cache.put(key, version, body)
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+    if not list_id:
+        raise HTTPException(status_code=400, detail="list_id is required for filtering or paging")
+
+    query = f"{list_id}|{completed}|{order}|{desc}"
+    key = decode_cursor(cursor, query) if cursor else None
+    tasks, next_key = await call(service.query_tasks, list_id, completed, order == "open_first", desc, key, limit)
+    headers = {"ETag": etag}
+    if next_key is not None:
+        headers["X-Next-Cursor"] = encode_cursor(query, next_key)
+    return JSONResponse(tasks, headers=headers)
 
 @app.post("/tasks", response_model=Task)
 async def create_task(task: Task):
-    for t in tasks:
-        if t.id == task.id:
-            raise HTTPException(status_code=400, detail="Task ID already exists")
-    
-    # Ensure list exists
-    if not any(l.id == task.list_id for l in task_lists):
-        # Fallback to default or create? For now let's allow it or default it
-        # Ideally should validate list_id. 
-        # If client sends garbage list_id, it might get lost in UI.
-        # But let's assume client is good.
-        pass
-        
-    tasks.append(task)
-    save_tasks()
-    return task
+    return await call(service.create_task, task.model_dump())
 
 @app.delete("/tasks/{task_id}")
 async def delete_task(task_id: str):
-    global tasks
-    tasks = [t for t in tasks if t.id != task_id]
-    save_tasks()
+    await call(service.delete_task, task_id)
     return {"status": "success"}
 
 @app.put("/tasks/{task_id}")
 async def update_task(task_id: str, task: Task):
-    for i, t in enumerate(tasks):
-        if t.id == task_id:
-            tasks[i] = task
-            save_tasks()
-            return task
-    raise HTTPException(status_code=404, detail="Task not found")
-
-def start_backend(host="127.0.0.1", port=8000):
-    uvicorn.run(app, host=host, port=port, log_level="info")
+    return await call(service.update_task, task_id, task.model_dump())
+
+@app.patch("/tasks/{task_id}")
+async def patch_task(task_id: str, patch: TaskPatch):
+    """
+    局部更新：只修改请求中给出的字段，例如 {"completed": true}，不会覆盖其它字段的并发修改
+    """
+    return await call(service.patch_task, task_id, patch.model_dump(exclude_unset=True))
+
+@app.post("/tasks/batch")
+async def batch_tasks(batch: BatchRequest):
+    """
+    批量操作：先整体校验，全部通过才执行（原子性），所有变更合并为一次持久化写入
+    """
+    result = await call(service.batch, [op.model_dump() for op in batch.ops])
+    if result["status"] == "error":
+        # Nothing was applied
+        return JSONResponse(status_code=409, content=result)
+    return result
+
+# --- Sync Endpoints ---
+
+@app.get("/changes")
+async def get_changes(since: int = 0, epoch: Optional[str] = None, list_id: Optional[str] = None):
+    # Clients poll with the revision and epoch from their previous response
+    result = service.unchanged_since(since, epoch)
+    if result is None:
+        result = await call(service.changes_since, since, epoch, list_id)
+    return JSONResponse(result)
+
+@app.get("/events")
+async def get_events():
+    """
+    服务端推送（SSE）：每次修改推送一条 change 事件，客户端据此调用 /changes 增量同步
+    """
+    return StreamingResponse(
+        hub.stream(service.hello()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+# --- Archive Endpoints ---
+
+@app.get("/search")
+async def search_tasks(
+    q: str,
+    list_id: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """
+    按标题搜索（中文按相邻两字，拉丁文字按单词），结果排序并分页。
+    启动后的清单后台加载完成之前只覆盖已加载的清单，此时 incomplete 为 true
+    """
+    return await call(service.search, q, list_id, offset, limit)
+
+@app.get("/export")
+async def export_data(include_archive: bool = True):
+    """
+    流式导出 NDJSON（清单、任务、归档任务各一行），不在内存中组装整份数据
+    """
+    source = await call(service.export_source, include_archive)
+    return StreamingResponse(
+        export_lines(*source),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="floatdo-export.ndjson"'},
+    )
+
+async def iter_body_lines(request: Request):
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+@app.post("/import")
+async def import_data(request: Request):
+    """
+    流式导入 NDJSON：逐行解析，每 IMPORT_CHUNK_SIZE 条记录作为一批写入存储；同 id 的记录覆盖现有数据
+    """
+    loop = asyncio.get_running_loop()
+    report = ImportReport()
+    state = {"archived_ids": None}
+    chunk = []
+    line_no = 0
+    async for line in iter_body_lines(request):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            chunk.append(decode_record(line))
+        except ValueError as e:
+            report.error(line_no, str(e))
+            continue
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            # Each chunk is written out before the next is parsed, so the pending queue stays one chunk deep
+            await loop.run_in_executor(None, service.import_chunk, chunk, report, state)
+            chunk = []
+    if chunk:
+        await loop.run_in_executor(None, service.import_chunk, chunk, report, state)
+    return report.to_dict()
+
+@app.get("/archive")
+async def get_archive(list_id: Optional[str] = None, offset: int = 0, limit: int = 50):
+    loop = asyncio.get_running_loop()
+    # The archive is read lazily from its compressed file, off the event loop
+    return await loop.run_in_executor(None, service.browse_archive, list_id, offset, limit)
+
+@app.post("/archive/{task_id}/restore")
+async def restore_task(task_id: str):
+    return await asyncio.get_running_loop().run_in_executor(None, service.restore_task, task_id)
+
+# --- Diagnostics ---
+
+@app.get("/persistence")
+async def get_persistence_stats():
+    return service.persistence_stats()
+
+@app.get("/health")
+async def health():
+    """
+    健康检查：后端可响应且写入线程在运行时返回 200，否则 503
+    """
+    writer_alive = service.writer_alive()
+    body = {
+        "status": "ok" if writer_alive else "degraded",
+        "epoch": store.epoch,
+        "revision": store.revision,
+        "uptime_s": round(time.time() - STARTED_AT, 1),
+    }
+    return JSONResponse(body, status_code=200 if writer_alive else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """
+    运行指标：各路由耗时直方图、内存数据规模、持久化写入统计、RSS、事件循环延迟与 CPU，并对照 PRD 验收预算
+    """
+    routes = {}
+    for key, histogram in sorted(route_latency.items()):
+        routes[key] = {**histogram.to_dict(), "errors": route_errors.get(key, 0)}
+    rss = rss_bytes()
+    rss_mb = round(rss / (1024 * 1024), 1) if rss is not None else None
+    slowest_p95 = max((h.quantile(0.95) or 0.0 for h in route_latency.values()), default=0.0)
+    loop = loop_monitor.to_dict()
+    load_ms = service.load_ms
+    # Phases of the desktop app's startup; empty when the backend runs in a process of its own
+    startup = startup_marks()
+    return {
+        "uptime_s": round(time.time() - STARTED_AT, 1),
+        "data_load_ms": round(load_ms, 1) if load_ms is not None else None,
+        "startup": {label: round(ms, 1) for label, ms in startup},
+        "routes": routes,
+        "store": {
+            "lists": len(store.lists),
+            "loaded_lists": len(store.loaded),
+            "loaded_tasks": len(store.tasks),
+            "revision": store.revision,
+            "changelog": len(store.changelog),
+            "search_terms": len(store.search.postings),
+            "sse_subscribers": len(hub.subscribers),
+        },
+        "response_cache": response_cache.stats(),
+        "persistence": service.persistence_stats(),
+        "process": {"rss_mb": rss_mb, "cpu_percent": loop["cpu_percent"], "threads": threading.active_count()},
+        "event_loop": loop,
+        "budgets": {
+            "operation_p95_ms": {"limit": BUDGETS["operation_ms"], "value": slowest_p95},
+            "memory_mb": {"limit": BUDGETS["memory_mb"], "value": rss_mb},
+            # The app is started once its last traced phase is done, not when the service has loaded
+            "startup_s": {"limit": BUDGETS["startup_s"], "value": round(startup[-1][1] / 1000, 3) if startup else None},
+            "cpu_percent": {"limit": BUDGETS["idle_cpu_percent"], "value": loop["cpu_percent"]},
+        },
+    }
+
+class BackendServer(uvicorn.Server):
+    """
+    启动完成（lifespan 已执行、开始接受请求）或启动失败时置位 server_ready，供等待方代替固定的 sleep
+    """
+
+    async def startup(self, sockets=None):
+        try:
+            await super().startup(sockets=sockets)
+        finally:
+            server_ready.set()
+
+server: Optional[BackendServer] = None
+# Set once the server accepts requests, or once starting it has failed (server.started tells which)
+server_ready = threading.Event()
+# Base URL for clients, known once the socket is bound; carries the real port when port 0 was asked for
+server_url: Optional[str] = None
+
+def bind_unix_socket(path: str) -> socket.socket:
+    """
+    在数据目录创建 Unix 域套接字，只允许当前用户连接（uvicorn 自带的 uds 选项会设成 0666）
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            # Left behind by a backend that did not shut down cleanly
+            os.remove(path)
+        else:
+            raise RuntimeError(f"Another backend is already listening on {path}")
+        finally:
+            probe.close()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    # Connecting needs write permission on the socket file
+    os.chmod(path, 0o600)
+    return sock
+
+def bind_tcp_socket(host: str, port: int) -> socket.socket:
+    """
+    绑定 TCP 端口；port 为 0 时由系统分配空闲端口，指定的端口被占用时也改用系统分配的端口，不再失败重试
+    """
+    for candidate in ((port, 0) if port else (0,)):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if sys.platform != "win32":
+            # Same as uvicorn: rebinding right after a restart must not wait out TIME_WAIT
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, candidate))
+            return sock
+        except OSError as e:
+            sock.close()
+            if candidate == 0:
+                raise
+            print(f"Port {port} is not available ({e}), using a free port instead")
+
+def start_backend(host=BACKEND_HOST, port=BACKEND_PORT, uds: Optional[str] = SOCKET_FILE if USE_UNIX_SOCKET else None):
+    global server, server_url
+    server_ready.clear()
+    # Open SSE streams would otherwise hold up a graceful shutdown indefinitely
+    config = uvicorn.Config(app, host=host, port=port, log_level="info", timeout_graceful_shutdown=3)
+    server = BackendServer(config)
+    try:
+        # Bound here rather than by uvicorn, so the address is known before the server starts
+        if uds is not None:
+            sock = bind_unix_socket(uds)
+            # The host part only fills the Host header
+            server_url = "http://floatdo"
+        else:
+            sock = bind_tcp_socket(host, port)
+            server_url = f"http://{host}:{sock.getsockname()[1]}"
+    except Exception:
+        server_ready.set()
+        raise
+    print(f"Backend listening on {uds or server_url}")
+    try:
+        server.run(sockets=[sock])
+    finally:
+        # Also covers a failed startup, which leaves server.started False
+        server_ready.set()
+        sock.close()
+        if uds is not None and os.path.exists(uds):
+            os.remove(uds)
+
+def wait_for_backend(timeout: float) -> Optional[str]:
+    """
+    等待后端就绪（最多 timeout 秒），返回客户端应使用的 base URL；超时或启动失败时返回 None
+    """
+    if not server_ready.wait(timeout) or server is None or not server.started:
+        return None
+    return server_url
+
+def stop_backend():
+    """
+    从其他线程请求后端正常退出，lifespan 中的落盘逻辑会执行
+    """
+    hub.close()
+    if server is not None:
+        server.should_exit = True
 
 if __name__ == "__main__":
     start_backend()
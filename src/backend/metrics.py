@@ -0,0 +1,134 @@
+import bisect
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+# Bucket upper bounds in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class LatencyHistogram:
+    """
+    固定分桶的耗时直方图：记录一次为 O(log 桶数)，不保存单次样本
+    """
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        # Upper bound of the bucket holding the q-th sample; the overflow bucket reports the max
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 3)
+        return round(self.max_ms, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = {f"le_{bound}": n for bound, n in zip(LATENCY_BUCKETS_MS, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+def rss_bytes() -> Optional[int]:
+    """
+    当前进程常驻内存（RSS），不依赖 psutil；取不到时返回 None
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        import resource
+        # macOS has no cheap current RSS; the peak is the closest stand-in (bytes there, not KiB)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+
+
+class LoopMonitor:
+    """
+    事件循环延迟与进程 CPU 采样：每隔 interval 醒来一次，醒来的迟到时间即循环延迟
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.lag = LatencyHistogram()
+        self.last_lag_ms = 0.0
+        self.cpu_percent = 0.0
+        # asyncio.Task while running
+        self.task = None
+
+    def start(self):
+        # Imported here: only the HTTP server runs an event loop, embedded mode never loads asyncio
+        import asyncio
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        import asyncio
+        last_wall = time.perf_counter()
+        last_cpu = time.process_time()
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.last_lag_ms = max(0.0, (now - expected) * 1000)
+            self.lag.observe(self.last_lag_ms)
+            # Whole process: the UI thread shares it, so this is the app's CPU use
+            cpu = time.process_time()
+            self.cpu_percent = (cpu - last_cpu) / (now - last_wall) * 100 if now > last_wall else 0.0
+            last_wall, last_cpu = now, cpu
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "last_lag_ms": round(self.last_lag_ms, 3),
+            "lag": self.lag.to_dict(),
+            "cpu_percent": round(self.cpu_percent, 2),
+        }
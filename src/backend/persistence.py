@@ -0,0 +1,173 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from src.backend.metrics import LatencyHistogram
+
+
+class WriteBehindPersister:
+    """
+    延迟写入（write-behind）：接口只把变更记入待写队列并立即返回，
+    后台线程在一个时间窗口内把一批变更合并为一次写入（group commit）
+    """
+
+    def __init__(self, storage, window_ms: int = 200):
+        self.storage = storage
+        self.window = window_ms / 1000.0
+        # Pending ops keyed by record, so repeated edits of one task collapse into its latest state.
+        # A re-touched key moves to the end to keep ops in the order they happened.
+        self.pending: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self.first_pending_at: Optional[float] = None
+        self.cond = threading.Condition()
+        # Serializes flushes so batches reach the storage in order
+        self.flush_lock = threading.Lock()
+        self.stopping = False
+        self.thread = None
+
+        # Stats
+        self.flush_count = 0
+        self.flushed_ops = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.flush_histogram = LatencyHistogram()
+
+    def start(self):
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name="floatdo-persister", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """
+        停止后台线程并写出剩余变更，然后关闭存储
+        """
+        with self.cond:
+            self.stopping = True
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        self.storage.close()
+
+    # --- Enqueue ---
+
+    @contextmanager
+    def group(self):
+        """
+        在 with 块内入队的变更保证在同一次写入中提交（期间后台线程不会切走队列）
+        """
+        with self.cond:
+            yield
+
+    # Task keys include the list: moving a task is a delete in the old list plus a put in the new one
+
+    def put_task(self, task: Dict[str, Any]):
+        self._enqueue(("task", task["list_id"], task["id"]), {"op": "put_task", "task": task})
+
+    def patch_task(self, task_id: str, list_id: str, fields: Dict[str, Any]):
+        key = ("task", list_id, task_id)
+        with self.cond:
+            queued = self.pending.get(key)
+            if queued is not None and queued["op"] == "put_task":
+                # Not written yet: fold the fields into the queued full state
+                op = {"op": "put_task", "task": {**queued["task"], **fields}}
+            elif queued is not None and queued["op"] == "patch_task":
+                op = {"op": "patch_task", "id": task_id, "list_id": list_id, "fields": {**queued["fields"], **fields}}
+            else:
+                op = {"op": "patch_task", "id": task_id, "list_id": list_id, "fields": dict(fields)}
+            self._enqueue(key, op)
+
+    def delete_task(self, task_id: str, list_id: str):
+        self._enqueue(("task", list_id, task_id), {"op": "delete_task", "id": task_id, "list_id": list_id})
+
+    def put_list(self, list_data: Dict[str, Any]):
+        self._enqueue(("list", list_data["id"]), {"op": "put_list", "list": list_data})
+
+    def delete_list(self, list_id: str):
+        # Own key: a later put_list of the same id must not swallow the cascade to the list's tasks
+        self._enqueue(("delete_list", list_id), {"op": "delete_list", "id": list_id})
+
+    def _enqueue(self, key, op):
+        with self.cond:
+            self.pending.pop(key, None)
+            self.pending[key] = op
+            if self.first_pending_at is None:
+                self.first_pending_at = time.monotonic()
+                self.cond.notify()
+
+    # --- Flush ---
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.stopping:
+                    self.cond.wait()
+                if self.stopping:
+                    return
+                # Flush latency is bounded by the window measured from the first op of the burst
+                deadline = self.first_pending_at + self.window
+                while not self.stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                if self.stopping:
+                    return
+            if not self.flush():
+                # Leave the ops queued and back off for a window before retrying
+                time.sleep(self.window)
+
+    def flush(self) -> bool:
+        with self.flush_lock:
+            return self._flush()
+
+    def _flush(self) -> bool:
+        with self.cond:
+            if not self.pending:
+                return True
+            batch = self.pending
+            self.pending = {}
+            self.first_pending_at = None
+
+        start = time.perf_counter()
+        try:
+            self.storage.apply(list(batch.values()))
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            with self.cond:
+                self.flush_errors += 1
+                # Newer ops queued meanwhile win over the failed ones
+                for key, op in self.pending.items():
+                    batch.pop(key, None)
+                    batch[key] = op
+                self.pending = batch
+                if self.first_pending_at is None:
+                    self.first_pending_at = time.monotonic()
+            return False
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self.cond:
+            self.flush_count += 1
+            self.flushed_ops += len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+            self.flush_histogram.observe(elapsed_ms)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self.cond:
+            return {
+                "queue_depth": len(self.pending),
+                "window_ms": self.window * 1000,
+                "flush_count": self.flush_count,
+                "flushed_ops": self.flushed_ops,
+                "flush_errors": self.flush_errors,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+                "avg_flush_ms": round(self.total_flush_ms / self.flush_count, 3) if self.flush_count else 0.0,
+                "flush_ms": self.flush_histogram.to_dict(),
+            }
@@ -0,0 +1,96 @@
+import re
+import unicodedata
+from typing import Dict, List, Set
+
+# Han, kana and hangul: no spaces between words, so these are indexed as character bigrams
+_CJK_RUN = re.compile(r"[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]+")
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    # NFKC folds full-width letters and digits typed with a Chinese IME
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：拉丁文字按单词，中日韩文字按相邻两字（单独一个字时按单字），结果去重并保持顺序
+    """
+    text = normalize(text)
+    terms = []
+    last = 0
+    for match in _CJK_RUN.finditer(text):
+        terms.extend(_WORD.findall(text[last:match.start()]))
+        run = match.group()
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        last = match.end()
+    terms.extend(_WORD.findall(text[last:]))
+    return list(dict.fromkeys(terms))
+
+
+def _is_cjk_char(term: str) -> bool:
+    return len(term) == 1 and _CJK_RUN.match(term) is not None
+
+
+class SearchIndex:
+    """
+    任务标题的倒排索引：词项 → 任务 id 集合，随任务增删改增量维护。
+    查询时取各词项集合的交集（从最小的开始），代价与命中数相关而不是任务总数
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        # CJK character -> bigrams containing it, so a one-character query finds longer runs
+        self.char_terms: Dict[str, Set[str]] = {}
+
+    def add(self, task_id: str, text: str):
+        for term in tokenize(text):
+            ids = self.postings.get(term)
+            if ids is None:
+                ids = self.postings[term] = set()
+                if len(term) == 2 and _is_cjk_char(term[0]):
+                    for char in set(term):
+                        self.char_terms.setdefault(char, set()).add(term)
+            ids.add(task_id)
+
+    def remove(self, task_id: str, text: str):
+        for term in tokenize(text):
+            ids = self.postings.get(term)
+            if ids is None:
+                continue
+            ids.discard(task_id)
+            if not ids:
+                del self.postings[term]
+                for char in set(term):
+                    terms = self.char_terms.get(char)
+                    if terms is not None:
+                        terms.discard(term)
+                        if not terms:
+                            del self.char_terms[char]
+
+    def _ids_for(self, term: str) -> Set[str]:
+        ids = self.postings.get(term, set())
+        if _is_cjk_char(term):
+            # A lone character matches itself and every bigram it is part of
+            ids = set(ids)
+            for bigram in self.char_terms.get(term, ()):
+                ids |= self.postings[bigram]
+        return ids
+
+    def match(self, query: str) -> Set[str]:
+        """
+        返回包含查询中全部词项的任务 id
+        """
+        terms = tokenize(query)
+        if not terms:
+            return set()
+        sets = sorted((self._ids_for(term) for term in terms), key=len)
+        result = set(sets[0])
+        for ids in sets[1:]:
+            if not result:
+                break
+            result &= ids
+        return result
@@ -0,0 +1,772 @@
+import functools
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.shared.paths import get_data_path
+from src.shared.config import STORAGE_BACKEND, JOURNAL_COMPACT_THRESHOLD, WRITE_BEHIND_WINDOW_MS, ARCHIVE_AFTER_DAYS
+from src.backend.storage import SqliteStorage, JsonShardStorage
+from src.backend.persistence import WriteBehindPersister
+from src.backend.store import TaskStore, TaskRecord, ListRecord
+from src.backend.archive import TaskArchive
+from src.backend.transfer import ImportReport, archived_ids
+
+DB_FILE = get_data_path('floatdo.db')
+# Legacy single-file JSON data: imported on first start by either engine
+DATA_FILE = get_data_path('tasks.json')
+LISTS_FILE = get_data_path('lists.json')
+JOURNAL_FILE = get_data_path('journal.ndjson')
+DATA_DIR = get_data_path()
+ARCHIVE_FILE = get_data_path('archive.ndjson.gz')
+ARCHIVE_SWEEP_INTERVAL = 3600
+# Seconds after start before the lists not opened yet are loaded in the background
+PRELOAD_DELAY = 2.0
+
+BATCH_OPS = ("create", "update", "delete")
+
+
+class ServiceError(Exception):
+    """
+    业务错误，status_code 与 HTTP 接口返回的状态码一致（400 / 404）
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def completion_time(task: Dict[str, Any], old: Optional[TaskRecord] = None) -> Optional[float]:
+    if not task.get("completed"):
+        return None
+    if task.get("completed_at") is not None:
+        return task["completed_at"]
+    if old is not None and old.completed and old.completed_at is not None:
+        return old.completed_at
+    return time.time()
+
+
+def make_record(task: Dict[str, Any], old: Optional[TaskRecord] = None) -> TaskRecord:
+    return TaskRecord(
+        task["id"], task["title"], bool(task.get("completed", False)), task.get("list_id", "default"),
+        completion_time(task, old),
+    )
+
+
+def invalid_task_field(task: Any) -> Optional[str]:
+    """
+    检查任务 dict 的字段类型，返回错误说明或 None。HTTP 请求已由 Pydantic 校验，同进程调用没有
+    """
+    if not isinstance(task, dict):
+        return "Invalid task"
+    for field in ("id", "title"):
+        if not isinstance(task.get(field), str):
+            return f"Missing or invalid {field}"
+    if not isinstance(task.get("completed", False), bool):
+        return "Invalid completed"
+    if not isinstance(task.get("list_id", "default"), str):
+        return "Invalid list_id"
+    completed_at = task.get("completed_at")
+    if completed_at is not None and (isinstance(completed_at, bool) or not isinstance(completed_at, (int, float))):
+        return "Invalid completed_at"
+    return None
+
+
+def on_writer(method):
+    """
+    在服务的写线程上执行该方法并等待结果；已经在写线程上（或服务未启动）时直接调用
+    """
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        if self.writer is None or threading.current_thread() is self.writer:
+            return method(self, *args, **kwargs)
+        return self.submit(functools.partial(method, self, *args, **kwargs)).result()
+    return call
+
+
+class TaskService:
+    """
+    服务层：清单与任务的全部业务逻辑，参数和返回值都是普通 dict。
+    HTTP 接口和同进程的前端客户端都调用这里，调用方可以在任意线程。
+
+    只有一个写线程接触内存仓库：修改和需要遍历仓库的读取都排队到它上面依次执行，
+    所以任何读取都看到某两次修改之间的一致状态。常用读取（清单、整个清单的任务、无变化的轮询）
+    使用按 revision 缓存的不可变快照，命中时不经过写线程。落盘由持久化线程完成
+    """
+
+    def __init__(self, storage, persister: WriteBehindPersister, archive: TaskArchive):
+        self.storage = storage
+        self.persister = persister
+        self.archive = archive
+        # Lists are loaded at startup, each list's tasks the first time it is opened
+        self.store = TaskStore(storage.load_list_tasks, storage.locate_task, storage.count_tasks)
+        self.store.on_change = self._publish
+        # Called on the writer thread with each change event, so they must not block
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.listeners_lock = threading.Lock()
+        # key -> ((epoch, revision), tuple of dicts) for in-process callers; replaced whole, never modified
+        self.views: Dict[Any, Tuple[Tuple[str, int], Tuple[Dict[str, Any], ...]]] = {}
+        self.jobs: "queue.Queue[Optional[Tuple[Future, Callable, tuple]]]" = queue.Queue()
+        self.writer: Optional[threading.Thread] = None
+        # How long start() took: loading lists, the first archive sweep, starting the threads
+        self.load_ms: Optional[float] = None
+        self.stop_event = threading.Event()
+        self.sweeper: Optional[threading.Thread] = None
+        self.preloader: Optional[threading.Thread] = None
+        self.lifecycle_lock = threading.Lock()
+
+    # --- Writer ---
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        把一次调用排到写线程上，返回 Future（异步调用方用 asyncio.wrap_future 等待，不阻塞事件循环）
+        """
+        future = Future()
+        if self.writer is None or threading.current_thread() is self.writer:
+            self._run_job(future, fn, args)
+        else:
+            self.jobs.put((future, fn, args))
+        return future
+
+    def _run_job(self, future: Future, fn: Callable, args: tuple):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def _writer_loop(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            self._run_job(*job)
+
+    # --- Lifecycle ---
+
+    def start(self) -> bool:
+        """
+        启动写线程、加载数据、启动持久化线程和归档清扫；已启动时直接返回 False，调用方据此判断是否由自己负责 stop
+        """
+        with self.lifecycle_lock:
+            if self.writer is not None:
+                return False
+            start = time.perf_counter()
+            self.writer = threading.Thread(target=self._writer_loop, name="floatdo-writer", daemon=True)
+            self.writer.start()
+            try:
+                self._load()
+            except Exception:
+                # Leave the service stopped, so a later start() tries again
+                self.jobs.put(None)
+                self.writer.join()
+                self.writer = None
+                raise
+            self.persister.start()
+            try:
+                self.archive_completed_tasks()
+            except Exception as e:
+                # Archiving can wait for the next sweep; the data is loaded and usable
+                print(f"Error archiving tasks: {e}")
+            self.stop_event.clear()
+            self.sweeper = threading.Thread(target=self._sweep_loop, name="floatdo-archive", daemon=True)
+            self.sweeper.start()
+            self.preloader = threading.Thread(target=self._preload_loop, name="floatdo-preload", daemon=True)
+            self.preloader.start()
+            self.load_ms = (time.perf_counter() - start) * 1000
+            return True
+
+    def stop(self):
+        """
+        停止归档清扫和后台加载，执行完已排队的修改，写出所有排队的变更并关闭存储
+        """
+        with self.lifecycle_lock:
+            writer = self.writer
+            if writer is None:
+                return
+            self.stop_event.set()
+            for thread in (self.sweeper, self.preloader):
+                if thread is not None:
+                    thread.join()
+            self.sweeper = self.preloader = None
+            self.jobs.put(None)
+            writer.join()
+            self.writer = None
+            # Calls that raced the shutdown still get an answer
+            while True:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    self._run_job(*job)
+            self.persister.close()
+
+    @on_writer
+    def _load(self):
+        self.storage.open()
+
+        # Load Lists
+        try:
+            task_lists = self.storage.load_lists()
+        except Exception as e:
+            print(f"Error loading lists: {e}")
+            task_lists = []
+
+        # Data files are our own output, so they skip model validation
+        self.store.load(task_lists)
+
+        if self.store.get_list("default") is None:
+            # Default list
+            default_list = ListRecord(id="default", name="今日任务")
+            self.store.insert_list_first(default_list)
+            self.persister.put_list(default_list.to_dict())
+
+        # The panel opens the default list first
+        try:
+            self.store.ensure_loaded("default")
+        except Exception as e:
+            print(f"Error loading tasks: {e}")
+
+    def _preload_loop(self):
+        # One list per writer job, so requests queued meanwhile run in between
+        if self.stop_event.wait(PRELOAD_DELAY):
+            return
+        while not self.stop_event.is_set():
+            try:
+                if not self._load_next_list():
+                    return
+            except Exception as e:
+                print(f"Error loading tasks: {e}")
+                return
+
+    @on_writer
+    def _load_next_list(self) -> bool:
+        """
+        加载一个尚未打开的清单（也就把它的任务加入了搜索索引），全部加载完时返回 False
+        """
+        unloaded = self.store.unloaded_lists()
+        if not unloaded:
+            return False
+        self.store.ensure_loaded(unloaded[0])
+        return True
+
+    def _sweep_loop(self):
+        while not self.stop_event.wait(ARCHIVE_SWEEP_INTERVAL):
+            try:
+                self.archive_completed_tasks()
+            except Exception as e:
+                print(f"Error archiving tasks: {e}")
+
+    # --- Change events ---
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        # Copy on write: the writer iterates whichever list it saw, without locking
+        with self.listeners_lock:
+            self.listeners = self.listeners + [listener]
+
+    def remove_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        with self.listeners_lock:
+            self.listeners = [l for l in self.listeners if l is not listener]
+
+    def _publish(self, kind: str, record_id: str, list_id: str, revision: int):
+        event = {"kind": kind, "id": record_id, "list_id": list_id, "revision": revision}
+        for listener in self.listeners:
+            # Runs inside the store mutation, before the change is queued for disk:
+            # a failing listener must not stop it from being written
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Error publishing change event: {e}")
+
+    def hello(self) -> Dict[str, Any]:
+        return {"epoch": self.store.epoch, "revision": self.store.revision}
+
+    # --- Snapshots ---
+
+    def _cached_view(self, key, revision: int) -> Optional[List[Dict[str, Any]]]:
+        # Lock-free: an int read and a dict lookup are atomic, and views are never modified in place
+        entry = self.views.get(key)
+        if entry is not None and entry[0] == (self.store.epoch, revision):
+            return list(entry[1])
+        return None
+
+    def _put_view(self, key, revision: int, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        view = tuple(items)
+        self.views[key] = ((self.store.epoch, revision), view)
+        return list(view)
+
+    # --- Lists ---
+
+    def get_lists(self, with_counts: bool = False) -> List[Dict[str, Any]]:
+        """
+        with_counts 为 True 时每个清单附带 open / completed 任务数（增量维护的计数器，不扫描任务）。
+        返回的 dict 属于共享快照，调用方不要修改
+        """
+        lists = self.cached_lists(with_counts)
+        if lists is None:
+            lists = self.build_lists(with_counts)
+        return lists
+
+    def cached_lists(self, with_counts: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """
+        不经过写线程取快照；没有当前快照时返回 None，异步调用方再排队调用 build_lists
+        """
+        # Counts move with every task change, the plain list only with list changes
+        revision = self.store.revision if with_counts else self.store.lists_revision
+        return self._cached_view(("lists", with_counts), revision)
+
+    @on_writer
+    def build_lists(self, with_counts: bool = False, keep: bool = True) -> List[Dict[str, Any]]:
+        """
+        keep 为 False 时不保存快照（调用方自己缓存结果，例如 HTTP 接口缓存编码后的响应）
+        """
+        lists = [l.to_dict() for l in self.store.all_lists()]
+        if with_counts:
+            counts = self.store.list_counts()
+            for data in lists:
+                data["open"], data["completed"] = counts.get(data["id"], (0, 0))
+        if not keep:
+            return lists
+        revision = self.store.revision if with_counts else self.store.lists_revision
+        return self._put_view(("lists", with_counts), revision, lists)
+
+    @on_writer
+    def create_list(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if self.store.get_list(data["id"]) is not None:
+            raise ServiceError(400, "List ID already exists")
+        record = ListRecord(data["id"], data["name"])
+        self.store.add_list(record)
+        self.persister.put_list(record.to_dict())
+        return record.to_dict()
+
+    @on_writer
+    def delete_list(self, list_id: str):
+        # The default list always exists
+        if list_id == "default":
+            raise ServiceError(400, "Cannot delete default list")
+        # Delete list and its associated tasks
+        if self.store.remove_list(list_id) is None:
+            raise ServiceError(404, "List not found")
+        self.persister.delete_list(list_id)
+        self.views.pop(("tasks", list_id), None)
+
+    # --- Tasks ---
+
+    def get_tasks(self, list_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        返回的 dict 属于共享快照，调用方不要修改
+        """
+        tasks = self.cached_tasks(list_id)
+        if tasks is None:
+            tasks = self.build_tasks(list_id)
+        return tasks
+
+    def cached_tasks(self, list_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        不经过写线程取一个清单的快照；没有当前快照时返回 None，异步调用方再排队调用 build_tasks
+        """
+        if not list_id:
+            return None
+        return self._cached_view(("tasks", list_id), self.store.list_revision(list_id))
+
+    @on_writer
+    def build_tasks(self, list_id: Optional[str] = None, keep: bool = True) -> List[Dict[str, Any]]:
+        """
+        keep 为 False 时不保存快照（调用方自己缓存结果，例如 HTTP 接口缓存编码后的响应）
+        """
+        if not list_id:
+            # Every task at once: the largest view and rarely asked for, so no snapshot of it is kept
+            return [t.to_dict() for t in self.store.all_tasks()]
+        tasks = (t.to_dict() for t in self.store.tasks_in_list(list_id))
+        if not keep:
+            return list(tasks)
+        return self._put_view(("tasks", list_id), self.store.list_revision(list_id), tasks)
+
+    @on_writer
+    def query_tasks(
+        self, list_id: str, completed: Optional[bool] = None, open_first: bool = False, desc: bool = False,
+        key=None, limit: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Any]:
+        tasks, next_key = self.store.query_tasks(list_id, completed, open_first, desc, key, limit)
+        return [t.to_dict() for t in tasks], next_key
+
+    @on_writer
+    def create_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if self.store.get_task(task["id"]) is not None:
+            raise ServiceError(400, "Task ID already exists")
+        # An unknown list_id is accepted as is; the client picks lists from get_lists
+        return self._apply_create(task).to_dict()
+
+    @on_writer
+    def update_task(self, task_id: str, task: Dict[str, Any]) -> Dict[str, Any]:
+        old = self.store.get_task(task_id)
+        if old is None:
+            raise ServiceError(404, "Task not found")
+        # A new id must be free, or the update would silently replace that other task
+        if task["id"] != task_id and self.store.get_task(task["id"]) is not None:
+            raise ServiceError(400, "Task ID already exists")
+        return self._apply_update(task_id, task, old).to_dict()
+
+    @on_writer
+    def patch_task(self, task_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        局部更新：只修改给出的字段，例如 {"completed": True}，不会覆盖其它字段的并发修改
+        """
+        old = self.store.get_task(task_id)
+        if old is None:
+            raise ServiceError(404, "Task not found")
+        return self._apply_patch(old, fields).to_dict()
+
+    @on_writer
+    def delete_task(self, task_id: str):
+        self._apply_delete(task_id)
+
+    @on_writer
+    def batch(self, ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        批量操作：先整体校验，全部通过才执行（原子性），所有变更合并为一次持久化写入。
+        有错误时返回 status 为 error 的逐条结果，且没有任何操作生效
+        """
+        results = []
+        # Existence of ids as it will be after the preceding ops of this batch
+        exists = {}
+        def task_exists(task_id):
+            if task_id not in exists:
+                exists[task_id] = self.store.get_task(task_id) is not None
+            return exists[task_id]
+
+        for i, op in enumerate(ops):
+            error = None
+            kind = op.get("op")
+            task = op.get("task")
+            target = op.get("id") if kind != "create" else (task.get("id") if isinstance(task, dict) else None)
+            if kind not in BATCH_OPS:
+                error = "Unknown op"
+            elif kind in ("create", "update") and task is None:
+                error = "Missing task"
+            elif kind in ("update", "delete") and not (isinstance(op.get("id"), str) and op["id"]):
+                error = "Missing id"
+            elif kind in ("create", "update") and invalid_task_field(task):
+                # Checked here, so applying cannot fail halfway through the batch
+                error = invalid_task_field(task)
+            elif kind == "create":
+                if task_exists(task["id"]):
+                    error = "Task ID already exists"
+                else:
+                    exists[task["id"]] = True
+            elif kind == "update":
+                if not task_exists(op["id"]):
+                    error = "Task not found"
+                elif task["id"] != op["id"] and task_exists(task["id"]):
+                    error = "Task ID already exists"
+                elif task["id"] != op["id"]:
+                    exists[op["id"]] = False
+                    exists[task["id"]] = True
+            elif kind == "delete":
+                exists[op["id"]] = False
+            results.append({"index": i, "op": kind, "id": target, "status": "error" if error else "ok", "detail": error})
+
+        if any(r["status"] == "error" for r in results):
+            # Nothing was applied
+            return {"status": "error", "results": results}
+
+        # One group: the persister cannot flush halfway through the batch
+        with self.persister.group():
+            for op in ops:
+                if op["op"] == "create":
+                    self._apply_create(op["task"])
+                elif op["op"] == "update":
+                    self._apply_update(op["id"], op["task"], self.store.get_task(op["id"]))
+                else:
+                    self._apply_delete(op["id"])
+        return {"status": "success", "results": results, "revision": self.store.revision}
+
+    def _apply_create(self, task: Dict[str, Any]) -> TaskRecord:
+        record = make_record(task)
+        self.store.add_task(record)
+        self.persister.put_task(record.to_dict())
+        return record
+
+    def _apply_update(self, task_id: str, task: Dict[str, Any], old: TaskRecord) -> TaskRecord:
+        record = make_record(task, old)
+        self.store.replace_task(task_id, record)
+        if record.id != task_id or record.list_id != old.list_id:
+            self.persister.delete_task(task_id, old.list_id)
+        self.persister.put_task(record.to_dict())
+        return record
+
+    def _apply_patch(self, old: TaskRecord, fields: Dict[str, Any]) -> TaskRecord:
+        fields = {k: v for k, v in fields.items() if k in ("title", "completed", "list_id") and v is not None}
+        record = TaskRecord.from_dict({**old.to_dict(), **fields})
+        if "completed" in fields:
+            if not record.completed:
+                record.completed_at = None
+            elif not old.completed or old.completed_at is None:
+                record.completed_at = time.time()
+            fields["completed_at"] = record.completed_at
+
+        self.store.replace_task(old.id, record)
+        if record.list_id != old.list_id:
+            # Moving to another list is a delete in the old shard plus a full put in the new one
+            self.persister.delete_task(old.id, old.list_id)
+            self.persister.put_task(record.to_dict())
+        elif fields:
+            self.persister.patch_task(old.id, old.list_id, fields)
+        return record
+
+    def _apply_delete(self, task_id: str) -> Optional[TaskRecord]:
+        removed = self.store.remove_task(task_id)
+        if removed is not None:
+            self.persister.delete_task(task_id, removed.list_id)
+        return removed
+
+    # --- Sync and search ---
+
+    def unchanged_since(self, since: int, epoch: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        没有任何变更时直接给出空结果（最常见的轮询），不必排队等写线程；否则返回 None
+        """
+        revision = self.store.revision
+        if since > 0 and since == revision and epoch == self.store.epoch:
+            return {
+                "epoch": epoch, "revision": revision, "reset": False,
+                "tasks": [], "deleted": [], "lists": [], "deleted_lists": [],
+            }
+        return None
+
+    def changes_since(self, since: int = 0, epoch: Optional[str] = None, list_id: Optional[str] = None) -> Dict[str, Any]:
+        result = self.unchanged_since(since, epoch)
+        if result is None:
+            result = self._changes_since(since, epoch, list_id)
+        return result
+
+    @on_writer
+    def _changes_since(self, since: int, epoch: Optional[str], list_id: Optional[str]) -> Dict[str, Any]:
+        return self.store.changes_since(since, epoch, list_id)
+
+    @on_writer
+    def search(self, query: str, list_id: Optional[str] = None, offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """
+        按标题搜索，返回 {"tasks", "total", "next_offset", "incomplete"}。
+        不为搜索加载清单：后台加载完所有清单之前只搜索已加载的，incomplete 为 True
+        """
+        tasks, total = self.store.search_tasks(query, list_id, offset, limit)
+        next_offset = offset + limit if offset + limit < total else None
+        incomplete = bool(self.store.unloaded_lists()) if list_id is None else not self.store.is_loaded(list_id)
+        return {"tasks": [t.to_dict() for t in tasks], "total": total, "next_offset": next_offset, "incomplete": incomplete}
+
+    # --- Export / import ---
+
+    @on_writer
+    def export_source(self, include_archive: bool = True):
+        """
+        导出用的数据源 (清单, 按清单取任务的函数, 归档任务迭代器, 没有清单记录的清单 id)，
+        交给 transfer.export_lines 逐行生成
+        """
+        lists = [l.to_dict() for l in self.store.all_lists()]
+        known = {l["id"] for l in lists}
+        # Tasks may name a list that does not exist (create_task accepts any list_id); a backup keeps them.
+        # Storage may not have seen the latest list changes, so memory decides which lists are known.
+        orphans = (set(self.storage.orphan_list_ids()) | self.store.list_index.keys()) - known
+        orphans = sorted(orphans)
+        # Loaded lists are read from memory now; the rest stream from storage in chunks, without loading them.
+        # Unloaded lists have no pending writes, so storage is current for them.
+        loaded = {
+            list_id: self.store.tasks_in_list(list_id)
+            for list_id in itertools.chain(known, orphans) if self.store.is_loaded(list_id)
+        }
+
+        def list_tasks(list_id: str):
+            if list_id in loaded:
+                return (t.to_dict() for t in loaded[list_id])
+            return self.storage.iter_list_tasks(list_id)
+
+        archived = self.archive.iter_tasks() if include_archive else None
+        return lists, list_tasks, archived, orphans
+
+    def import_chunk(self, chunk: List[Tuple[str, Dict[str, Any]]], report: ImportReport, state: Dict[str, Any]):
+        """
+        导入一批已解析的记录（同 id 覆盖），写入存储后才返回，所以排队的写入最多一批。
+        state 在同一次导入的各批之间共享；文件读写都在调用方线程，写线程只做内存中的修改
+        """
+        if state.get("archived_ids") is None and any(kind == "archived_task" for kind, _ in chunk):
+            state["archived_ids"] = archived_ids(self.archive)
+        to_archive = self._import_records(chunk, report, state)
+        self.persister.flush()
+        if to_archive:
+            self.archive.append(to_archive)
+
+    @on_writer
+    def _import_records(self, chunk, report: ImportReport, state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        to_archive = []
+        with self.persister.group():
+            for kind, data in chunk:
+                if kind == "list":
+                    task_list = ListRecord.from_dict(data)
+                    self.store.add_list(task_list)
+                    self.persister.put_list(task_list.to_dict())
+                    report.lists += 1
+                elif kind == "task":
+                    record = TaskRecord.from_dict(data)
+                    old = self.store.get_task(record.id)
+                    if old is None:
+                        self.store.add_task(record)
+                    else:
+                        self.store.replace_task(record.id, record)
+                        if old.list_id != record.list_id:
+                            self.persister.delete_task(record.id, old.list_id)
+                    self.persister.put_task(record.to_dict())
+                    report.tasks += 1
+                else:
+                    if data["id"] in state["archived_ids"] or self.store.get_task(data["id"]) is not None:
+                        report.skipped += 1
+                        continue
+                    state["archived_ids"].add(data["id"])
+                    to_archive.append(data)
+                    report.archived += 1
+        return to_archive
+
+    # --- Archive ---
+
+    def archive_completed_tasks(self) -> int:
+        """
+        把完成超过 ARCHIVE_AFTER_DAYS 天的任务移入归档，热数据只保留进行中的工作。
+        归档文件在调用方线程写入，写线程只负责挑出和移除任务
+        """
+        if ARCHIVE_AFTER_DAYS <= 0:
+            return 0
+        stale = self._stale_tasks()
+        if not stale:
+            return 0
+
+        # The archive copy must be on disk before the hot copy is dropped
+        try:
+            self.archive.append([t.to_dict() for t in stale])
+        except Exception as e:
+            print(f"Error archiving tasks: {e}")
+            return 0
+        skipped = self._drop_archived(stale)
+        if skipped:
+            # Changed while the archive was written: they stay hot, so their archived copies go,
+            # or restoring them would clash and the next sweep would archive them again
+            try:
+                self.archive.discard(skipped)
+            except Exception as e:
+                print(f"Error archiving tasks: {e}")
+        return len(stale) - len(skipped)
+
+    @on_writer
+    def _stale_tasks(self) -> List[TaskRecord]:
+        now = time.time()
+        cutoff = now - ARCHIVE_AFTER_DAYS * 86400
+        stale = []
+        # Only lists that have been opened are swept; others are swept once they load
+        for task in self.store.loaded_tasks():
+            if not task.completed:
+                continue
+            if task.completed_at is None:
+                # Completed before completion times were recorded: start the clock now
+                stamped = TaskRecord(task.id, task.title, task.completed, task.list_id, now)
+                self.store.replace_task(task.id, stamped)
+                self.persister.put_task(stamped.to_dict())
+            elif task.completed_at < cutoff:
+                stale.append(task)
+        return stale
+
+    @on_writer
+    def _drop_archived(self, stale: List[TaskRecord]) -> Set[str]:
+        """
+        从热数据中移除已写入归档的任务，返回期间被修改或删除、因而没有移除的 id
+        """
+        skipped = set()
+        for task in stale:
+            # Records are replaced on every change, so identity means it was not touched meanwhile
+            if self.store.tasks.get(task.id) is not task:
+                skipped.add(task.id)
+                continue
+            self.store.remove_task(task.id)
+            self.persister.delete_task(task.id, task.list_id)
+        return skipped
+
+    def browse_archive(self, list_id: Optional[str] = None, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        # The archive has its own lock and is read lazily from its compressed file
+        return self.archive.browse(list_id, max(0, offset), max(1, min(limit, 500)))
+
+    def restore_task(self, task_id: str) -> Dict[str, Any]:
+        if self._has_task(task_id):
+            raise ServiceError(400, "Task ID already exists")
+        # Rewriting the archive file happens on the caller's thread
+        data = self.archive.take(task_id)
+        if data is None:
+            raise ServiceError(404, "Archived task not found")
+        restored = self._restore_record(data)
+        if restored is None:
+            # Created while the archive was being rewritten: keep the archived copy
+            self.archive.append([data])
+            raise ServiceError(400, "Task ID already exists")
+        return restored
+
+    @on_writer
+    def _has_task(self, task_id: str) -> bool:
+        return self.store.get_task(task_id) is not None
+
+    @on_writer
+    def _restore_record(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.store.get_task(data["id"]) is not None:
+            return None
+        record = TaskRecord.from_dict(data)
+        if self.store.get_list(record.list_id) is None:
+            # Its list was deleted in the meantime
+            record.list_id = "default"
+        if record.completed:
+            # Restart the clock so the next sweep does not archive it right away
+            record.completed_at = time.time()
+        self.store.add_task(record)
+        self.persister.put_task(record.to_dict())
+        return record.to_dict()
+
+    # --- Diagnostics ---
+
+    def persistence_stats(self) -> Dict[str, Any]:
+        return self.persister.stats()
+
+    def writer_alive(self) -> bool:
+        """
+        写线程和持久化线程都在运行
+        """
+        threads = (self.writer, self.persister.thread)
+        return all(t is not None and t.is_alive() for t in threads)
+
+
+def create_storage():
+    """
+    按配置创建存储引擎（sqlite 或 json），尚未打开
+    """
+    if STORAGE_BACKEND == "json":
+        return JsonShardStorage(DATA_DIR, JOURNAL_COMPACT_THRESHOLD, DATA_FILE, LISTS_FILE, JOURNAL_FILE)
+    return SqliteStorage(DB_FILE, DATA_FILE, LISTS_FILE)
+
+
+def create_service() -> TaskService:
+    storage = create_storage()
+    return TaskService(storage, WriteBehindPersister(storage, WRITE_BEHIND_WINDOW_MS), TaskArchive(ARCHIVE_FILE))
+
+
+_service: Optional[TaskService] = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> TaskService:
+    """
+    进程内唯一的服务实例：桌面端直接调用与 HTTP 接口共用同一份数据
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = create_service()
+        return _service
@@ -0,0 +1,647 @@
+import json
+import os
+import sqlite3
+import threading
+from urllib.parse import quote, unquote
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+SCHEMA_VERSION = 2
+
+# Task fields a patch_task op may change; the id and list_id only change through delete + put
+PATCHABLE_FIELDS = ("title", "completed", "completed_at")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lists (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    list_id TEXT NOT NULL DEFAULT 'default',
+    completed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_list_id ON tasks(list_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed);
+"""
+
+
+class SqliteStorage:
+    """
+    本地SQLite封装：每次增删改只涉及一行记录，替代整文件重写的 JSON 存储
+    """
+
+    def __init__(self, db_path: str, legacy_tasks_file: Optional[str] = None, legacy_lists_file: Optional[str] = None):
+        self.db_path = db_path
+        self.legacy_tasks_file = legacy_tasks_file
+        self.legacy_lists_file = legacy_lists_file
+        self.conn = None
+        # uvicorn handlers and the shutdown hook may run on different threads
+        self.lock = threading.Lock()
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL is durable across app crashes, only an OS crash can lose the last commits
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        if self.legacy_tasks_file and self.legacy_lists_file:
+            try:
+                self.migrate_from_json(self.legacy_tasks_file, self.legacy_lists_file)
+            except Exception as e:
+                print(f"Error migrating JSON data: {e}")
+
+    def close(self):
+        if self.conn is not None:
+            with self.lock:
+                self.conn.close()
+                self.conn = None
+
+    # --- Migration ---
+
+    def _upgrade_schema(self):
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")}
+        if "completed_at" not in columns:
+            # Databases created before the archive tier
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN completed_at REAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] > 0:
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def needs_migration(self) -> bool:
+        # user_version stays 0 until the legacy JSON files have been imported once
+        return self.conn.execute("PRAGMA user_version").fetchone()[0] == 0
+
+    def migrate_from_json(self, tasks_file: str, lists_file: str):
+        """
+        首次启动时把旧版 tasks.json / lists.json 导入数据库，导入后将旧文件改名保留备份
+        """
+        if not self.needs_migration():
+            return
+
+        lists = _read_json_file(lists_file)
+        tasks = _read_json_file(tasks_file)
+
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO lists (id, name) VALUES (?, ?)",
+                    [(l["id"], l["name"]) for l in lists],
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO tasks (id, title, completed, list_id, completed_at) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            t["id"], t["title"], int(bool(t.get("completed", False))),
+                            t.get("list_id", "default"), t.get("completed_at"),
+                        )
+                        for t in tasks
+                    ],
+                )
+                self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        for path in (tasks_file, lists_file):
+            if os.path.exists(path):
+                try:
+                    os.replace(path, path + ".migrated")
+                except OSError as e:
+                    print(f"Error renaming migrated file {path}: {e}")
+
+    # --- Reads ---
+
+    def load_lists(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self.conn.execute("SELECT id, name FROM lists ORDER BY rowid").fetchall()
+        return [{"id": r[0], "name": r[1]} for r in rows]
+
+    def load_list_tasks(self, list_id: str) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, title, completed, list_id, completed_at FROM tasks WHERE list_id = ? ORDER BY rowid",
+                (list_id,),
+            ).fetchall()
+        return [
+            {"id": r[0], "title": r[1], "completed": bool(r[2]), "list_id": r[3], "completed_at": r[4]}
+            for r in rows
+        ]
+
+    def iter_list_tasks(self, list_id: str, chunk_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        分批读取一个清单的任务（按 rowid 翻页），内存只与批大小相关，批与批之间不占用连接
+        """
+        last_rowid = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT rowid, id, title, completed, list_id, completed_at FROM tasks "
+                    "WHERE list_id = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (list_id, last_rowid, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield {"id": r[1], "title": r[2], "completed": bool(r[3]), "list_id": r[4], "completed_at": r[5]}
+            last_rowid = rows[-1][0]
+
+    def locate_task(self, task_id: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT list_id FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return row[0] if row else None
+
+    def orphan_list_ids(self) -> List[str]:
+        """
+        任务引用了、但没有清单记录的清单 id（创建任务时接受任意 list_id）
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT list_id FROM tasks WHERE list_id NOT IN (SELECT id FROM lists) ORDER BY list_id"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def count_tasks(self, list_ids: List[str]) -> Dict[str, Tuple[int, int]]:
+        """
+        各清单的 (未完成, 已完成) 任务数，走 list_id 索引，不加载任务
+        """
+        counts = {}
+        with self.lock:
+            for list_id in list_ids:
+                total, done = self.conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(completed), 0) FROM tasks WHERE list_id = ?", (list_id,)
+                ).fetchone()
+                counts[list_id] = (total - done, done)
+        return counts
+
+    # --- Mutations ---
+
+    def apply(self, ops: List[Dict[str, Any]]):
+        """
+        在一个事务中写入一组操作，每个任务操作只涉及一行
+        """
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                for op in ops:
+                    self._apply_op(op)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _apply_op(self, op: Dict[str, Any]):
+        kind = op["op"]
+        if kind == "put_task":
+            task = op["task"]
+            # Upsert keeps the rowid, so an updated task keeps its position
+            self.conn.execute(
+                "INSERT INTO tasks (id, title, completed, list_id, completed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET title = excluded.title, completed = excluded.completed, "
+                "list_id = excluded.list_id, completed_at = excluded.completed_at",
+                (task["id"], task["title"], int(task["completed"]), task["list_id"], task.get("completed_at")),
+            )
+        elif kind == "patch_task":
+            # Only the columns that changed; names come from PATCHABLE_FIELDS, never from the request
+            fields = {k: v for k, v in op["fields"].items() if k in PATCHABLE_FIELDS}
+            if "completed" in fields:
+                fields["completed"] = int(fields["completed"])
+            if fields:
+                assignments = ", ".join(f"{name} = ?" for name in fields)
+                self.conn.execute(
+                    f"UPDATE tasks SET {assignments} WHERE id = ? AND list_id = ?",
+                    (*fields.values(), op["id"], op["list_id"]),
+                )
+        elif kind == "delete_task":
+            # Scoped to the list: a task moved to another list in the same batch keeps its new row
+            self.conn.execute("DELETE FROM tasks WHERE id = ? AND list_id = ?", (op["id"], op["list_id"]))
+        elif kind == "put_list":
+            self.conn.execute(
+                "INSERT INTO lists (id, name) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET name = excluded.name",
+                (op["list"]["id"], op["list"]["name"]),
+            )
+        elif kind == "delete_list":
+            # The list's tasks go with it; the task delete uses idx_tasks_list_id
+            self.conn.execute("DELETE FROM tasks WHERE list_id = ?", (op["id"],))
+            self.conn.execute("DELETE FROM lists WHERE id = ?", (op["id"],))
+
+
+class _Shard:
+    """
+    一个清单的分片：<id>.json 快照 + <id>.journal 追加日志
+    """
+
+    def __init__(self, shards_dir: str, list_id: str):
+        base = os.path.join(shards_dir, quote(list_id, safe=''))
+        self.snapshot_file = base + ".json"
+        self.journal_file = base + ".journal"
+        # Journal being folded into the snapshot by a compaction run
+        self.compacting_file = base + ".journal.compacting"
+        self.journal = None
+        self.journal_ops = None
+        self.compact_thread = None
+
+    def files(self):
+        return (self.snapshot_file, self.journal_file, self.compacting_file)
+
+
+class JsonShardStorage:
+    """
+    JSON 存储：按清单分片。manifest.json 记录清单，lists/<id>.json 为该清单任务的快照，
+    每次增删改只向所在分片的日志追加一行；某个分片的日志超过阈值后在后台线程只重写这个分片。
+    删除清单即删除其分片文件。task-index.json 记录任务 id 所在的清单，查找未加载的任务时不必读取所有分片
+    """
+
+    def __init__(
+        self, data_dir: str, compact_threshold: int = 1000,
+        legacy_tasks_file: Optional[str] = None, legacy_lists_file: Optional[str] = None,
+        legacy_journal_file: Optional[str] = None,
+    ):
+        self.manifest_file = os.path.join(data_dir, 'manifest.json')
+        self.shards_dir = os.path.join(data_dir, 'lists')
+        self.compact_threshold = compact_threshold
+        self.legacy_tasks_file = legacy_tasks_file
+        self.legacy_lists_file = legacy_lists_file
+        self.legacy_journal_file = legacy_journal_file
+        self.lists: Dict[str, Dict[str, Any]] = {}
+        self.shards: Dict[str, _Shard] = {}
+        # On-disk task id -> list id index: a {id: list id} snapshot plus a journal of changes
+        self.index_file = os.path.join(data_dir, 'task-index.json')
+        self.index_journal_file = os.path.join(data_dir, 'task-index.journal')
+        self.index_journal = None
+        self.index_journal_ops = 0
+        # Whether the index files cover every shard; data from before the index gets it built once
+        self.index_ready = False
+        # The index in memory, read on the first lookup of a task whose shard is not loaded
+        self.task_locations: Optional[Dict[str, str]] = None
+        # Keeps building or reading the index and journaling into it from interleaving
+        self.index_lock = threading.Lock()
+        self.lock = threading.Lock()
+
+    def open(self):
+        os.makedirs(self.shards_dir, exist_ok=True)
+        if not os.path.exists(self.manifest_file):
+            self._migrate_legacy()
+        manifest = _read_json_file(self.manifest_file) or {}
+        self.lists = {l["id"]: l for l in manifest.get("lists", [])}
+        self.index_ready = os.path.exists(self.index_file)
+        if not self.index_ready and not os.listdir(self.shards_dir):
+            # Nothing stored yet: the index starts out complete
+            _write_json_atomic(self.index_file, {})
+            self.index_ready = True
+
+    def close(self):
+        for shard in list(self.shards.values()):
+            self._close_shard(shard)
+        with self.index_lock:
+            if self.index_journal is not None:
+                self.index_journal.close()
+                self.index_journal = None
+
+    # --- Reads ---
+
+    def load_lists(self) -> List[Dict[str, Any]]:
+        return list(self.lists.values())
+
+    def load_list_tasks(self, list_id: str) -> List[Dict[str, Any]]:
+        shard = self._shard(list_id)
+        with self.lock:
+            return list(_fold_shard(shard).values())
+
+    def iter_list_tasks(self, list_id: str) -> Iterator[Dict[str, Any]]:
+        # A shard only exists as snapshot + journal, so it is folded whole: memory is one list's tasks
+        return iter(self.load_list_tasks(list_id))
+
+    def count_tasks(self, list_ids: List[str]) -> Dict[str, Tuple[int, int]]:
+        """
+        各清单的 (未完成, 已完成) 任务数。分片没有计数，只能重放一遍，但结果不留在内存里
+        """
+        counts = {}
+        for list_id in list_ids:
+            shard = self._shard(list_id)
+            with self.lock:
+                tasks = _fold_shard(shard)
+            done = sum(1 for t in tasks.values() if t.get("completed"))
+            counts[list_id] = (len(tasks) - done, done)
+        return counts
+
+    def locate_task(self, task_id: str) -> Optional[str]:
+        """
+        查找任务所在的清单。第一次调用时读取 id 索引文件（只有 id 和清单 id），不读取各分片
+        """
+        if self.task_locations is None:
+            with self.index_lock:
+                if self.task_locations is None:
+                    self.task_locations = self._load_index()
+        return self.task_locations.get(task_id)
+
+    def orphan_list_ids(self) -> List[str]:
+        """
+        有分片文件、但不在 manifest 中的清单 id（创建任务时接受任意 list_id）
+        """
+        return sorted(self._shard_list_ids() - self.lists.keys())
+
+    def _shard_list_ids(self) -> Set[str]:
+        list_ids = set()
+        for name in os.listdir(self.shards_dir):
+            for suffix in (".json", ".journal"):
+                if name.endswith(suffix):
+                    list_ids.add(unquote(name[:-len(suffix)]))
+        return list_ids
+
+    def _load_index(self) -> Dict[str, str]:
+        # Called with index_lock held
+        if self.index_ready:
+            locations = _read_json_file(self.index_file) or {}
+            for op in _read_journal(self.index_journal_file):
+                _apply_index_op(locations, op)
+            return locations
+
+        # No index yet (first run, or data written before it existed): read every shard once
+        locations = {}
+        for list_id in self._shard_list_ids():
+            for task in self.load_list_tasks(list_id):
+                locations[task["id"]] = list_id
+        _write_json_atomic(self.index_file, locations)
+        self.index_ready = True
+        return locations
+
+    def _index_op(self, op: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        op 对 id 索引的修改（没有修改时为 None），同时更新内存中的索引
+        """
+        kind = op["op"]
+        if kind == "put_task":
+            index_op = {"op": "put_task", "id": op["task"]["id"], "list_id": op["task"]["list_id"]}
+        elif kind == "delete_task":
+            index_op = {"op": "delete_task", "id": op["id"], "list_id": op["list_id"]}
+        elif kind == "delete_list":
+            index_op = {"op": "delete_list", "id": op["id"]}
+        else:
+            return None
+        if self.task_locations is not None and not _apply_index_op(self.task_locations, index_op):
+            # Most puts are edits in place: nothing to journal
+            return None
+        return index_op
+
+    def _journal_index(self, index_ops: List[Dict[str, Any]]):
+        # Called with index_lock held
+        if self.index_journal is None:
+            self.index_journal_ops = _count_lines(self.index_journal_file)
+            self.index_journal = open(self.index_journal_file, 'a', encoding='utf-8')
+        self.index_journal.write("".join(json.dumps(op, ensure_ascii=False, separators=(',', ':')) + "\n" for op in index_ops))
+        self.index_journal.flush()
+        self.index_journal_ops += len(index_ops)
+        if self.index_journal_ops >= self.compact_threshold:
+            # Small enough to rewrite in place; replaying the journal over a newer snapshot is harmless
+            if self.task_locations is None:
+                self.task_locations = self._load_index()
+            _write_json_atomic(self.index_file, self.task_locations)
+            self.index_journal.close()
+            self.index_journal = open(self.index_journal_file, 'w', encoding='utf-8')
+            self.index_journal_ops = 0
+
+    # --- Journaled mutations ---
+
+    def apply(self, ops: List[Dict[str, Any]]):
+        """
+        一组操作按分片聚合，每个被改动的分片追加一次；清单增删时重写（很小的）manifest
+        """
+        with self.index_lock:
+            index_ops = [index_op for index_op in map(self._index_op, ops) if index_op is not None]
+            if index_ops and self.index_ready:
+                # Ahead of the shards: an entry for a task that is not there costs one shard read,
+                # a task without an entry could be created twice
+                self._journal_index(index_ops)
+            self._apply_shards(ops)
+
+    def _apply_shards(self, ops: List[Dict[str, Any]]):
+        buffers: Dict[str, List[str]] = {}
+        manifest_changed = False
+        for op in ops:
+            kind = op["op"]
+            if kind == "put_task":
+                list_id = op["task"]["list_id"]
+            elif kind == "patch_task":
+                # Journaled as is: a one-field line instead of the whole task
+                list_id = op["list_id"]
+            elif kind == "delete_task":
+                list_id = op["list_id"]
+            elif kind == "put_list":
+                self.lists[op["list"]["id"]] = op["list"]
+                manifest_changed = True
+                continue
+            elif kind == "delete_list":
+                self.lists.pop(op["id"], None)
+                manifest_changed = True
+                # Anything buffered for the shard dies with it
+                buffers.pop(op["id"], None)
+                self._delete_shard(op["id"])
+                continue
+            else:
+                continue
+            buffers.setdefault(list_id, []).append(json.dumps(op, ensure_ascii=False, separators=(',', ':')) + "\n")
+
+        if manifest_changed:
+            _write_json_atomic(self.manifest_file, {"lists": list(self.lists.values())})
+        for list_id, lines in buffers.items():
+            self._append(self._shard(list_id), lines)
+
+    def _append(self, shard: _Shard, lines: List[str]):
+        with self.lock:
+            if shard.journal is None:
+                shard.journal_ops = _count_lines(shard.journal_file)
+                shard.journal = open(shard.journal_file, 'a', encoding='utf-8')
+            shard.journal.write("".join(lines))
+            shard.journal.flush()
+            shard.journal_ops += len(lines)
+            if shard.journal_ops >= self.compact_threshold and shard.compact_thread is None:
+                self._start_compaction(shard)
+
+    def _shard(self, list_id: str) -> _Shard:
+        shard = self.shards.get(list_id)
+        if shard is None:
+            shard = self.shards[list_id] = _Shard(self.shards_dir, list_id)
+        return shard
+
+    def _close_shard(self, shard: _Shard):
+        thread = shard.compact_thread
+        if thread is not None:
+            thread.join()
+        with self.lock:
+            if shard.journal is not None:
+                shard.journal.close()
+                shard.journal = None
+
+    def _delete_shard(self, list_id: str):
+        shard = self._shard(list_id)
+        self._close_shard(shard)
+        with self.lock:
+            for path in shard.files():
+                if os.path.exists(path):
+                    os.remove(path)
+            del self.shards[list_id]
+
+    # --- Compaction ---
+
+    def _start_compaction(self, shard: _Shard):
+        # Called with self.lock held: new ops go to a fresh journal while the old one is folded
+        shard.journal.close()
+        if os.path.exists(shard.compacting_file):
+            # A previous run was interrupted; keep its ops ahead of the current journal
+            with open(shard.compacting_file, 'a', encoding='utf-8') as dst, \
+                    open(shard.journal_file, 'r', encoding='utf-8') as src:
+                dst.write(src.read())
+            os.remove(shard.journal_file)
+        else:
+            os.replace(shard.journal_file, shard.compacting_file)
+        shard.journal = open(shard.journal_file, 'a', encoding='utf-8')
+        shard.journal_ops = 0
+        shard.compact_thread = threading.Thread(target=self._compact, args=(shard,), daemon=True)
+        shard.compact_thread.start()
+
+    def _compact(self, shard: _Shard):
+        try:
+            tasks = _fold_shard(shard, include_journal=False)
+            tmp_path = shard.snapshot_file + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(list(tasks.values()), f, ensure_ascii=False, separators=(',', ':'))
+            with self.lock:
+                # Swap snapshot and drop the folded journal together, so readers never replay it twice
+                os.replace(tmp_path, shard.snapshot_file)
+                os.remove(shard.compacting_file)
+        except Exception as e:
+            print(f"Error compacting shard {shard.snapshot_file}: {e}")
+        finally:
+            shard.compact_thread = None
+
+    # --- Migration ---
+
+    def _migrate_legacy(self):
+        """
+        从单文件格式（tasks.json / lists.json / journal.ndjson）拆分为按清单的分片
+        """
+        lists = {}
+        tasks = {}
+        if self.legacy_lists_file and os.path.exists(self.legacy_lists_file):
+            lists = {l["id"]: l for l in _read_json_file(self.legacy_lists_file)}
+        if self.legacy_tasks_file and os.path.exists(self.legacy_tasks_file):
+            tasks = {t["id"]: t for t in _read_json_file(self.legacy_tasks_file)}
+        if self.legacy_journal_file:
+            for path in (self.legacy_journal_file + ".compacting", self.legacy_journal_file):
+                for op in _read_journal(path):
+                    _apply_op(lists, tasks, op)
+
+        by_list: Dict[str, List[Dict[str, Any]]] = {}
+        for task in tasks.values():
+            by_list.setdefault(task.get("list_id", "default"), []).append(task)
+        for list_id, shard_tasks in by_list.items():
+            _write_json_atomic(_Shard(self.shards_dir, list_id).snapshot_file, shard_tasks)
+        _write_json_atomic(self.index_file, {t["id"]: list_id for list_id, shard_tasks in by_list.items() for t in shard_tasks})
+        # The manifest goes last: its presence marks the migration as done
+        _write_json_atomic(self.manifest_file, {"lists": list(lists.values())})
+
+        legacy = (self.legacy_tasks_file, self.legacy_lists_file, self.legacy_journal_file)
+        for path in legacy:
+            if path and os.path.exists(path):
+                try:
+                    os.replace(path, path + ".migrated")
+                except OSError as e:
+                    print(f"Error renaming migrated file {path}: {e}")
+
+
+def _fold_shard(shard: _Shard, include_journal: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    分片快照 + 日志重放，得到该清单当前的任务（按 id 保持插入顺序）
+    """
+    tasks = {t["id"]: t for t in _read_json_file(shard.snapshot_file)}
+    journals = [shard.compacting_file]
+    if include_journal:
+        journals.append(shard.journal_file)
+    for path in journals:
+        for op in _read_journal(path):
+            _apply_op({}, tasks, op)
+    return tasks
+
+
+def _apply_op(lists: Dict[str, Dict[str, Any]], tasks: Dict[str, Dict[str, Any]], op: Dict[str, Any]):
+    # Every op carries the full new state of what it touches, so replaying an op twice is harmless
+    kind = op.get("op")
+    if kind == "put_task":
+        tasks[op["task"]["id"]] = op["task"]
+    elif kind == "patch_task":
+        task = tasks.get(op["id"])
+        if task is not None and task.get("list_id") == op["list_id"]:
+            tasks[op["id"]] = {**task, **op["fields"]}
+    elif kind == "delete_task":
+        tasks.pop(op["id"], None)
+    elif kind == "put_list":
+        lists[op["list"]["id"]] = op["list"]
+    elif kind == "delete_list":
+        lists.pop(op["id"], None)
+        for task_id in [tid for tid, t in tasks.items() if t.get("list_id") == op["id"]]:
+            del tasks[task_id]
+
+
+def _apply_index_op(locations: Dict[str, str], op: Dict[str, Any]) -> bool:
+    """
+    在 id 索引上执行一条日志记录，返回索引是否改变
+    """
+    kind = op.get("op")
+    if kind == "put_task":
+        if locations.get(op["id"]) == op["list_id"]:
+            return False
+        locations[op["id"]] = op["list_id"]
+    elif kind == "delete_task":
+        # A delete from the list a task has since moved out of leaves it alone
+        if locations.get(op["id"]) != op["list_id"]:
+            return False
+        del locations[op["id"]]
+    elif kind == "delete_list":
+        for task_id in [tid for tid, lid in locations.items() if lid == op["id"]]:
+            del locations[task_id]
+    return True
+
+
+def _read_journal(path: str):
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A torn last line from a crash mid-append; everything before it is intact
+                print(f"Skipping corrupt journal line in {path}")
+
+
+def _count_lines(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+
+def _write_json_atomic(path: str, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _read_json_file(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return []
@@ -0,0 +1,454 @@
+import bisect
+import heapq
+import itertools
+import sys
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.backend.search import SearchIndex, normalize, tokenize
+
+# How many changed records the change log remembers; older clients get a full reset
+CHANGELOG_LIMIT = 10000
+
+
+class TaskRecord:
+    """
+    任务的内部紧凑表示（__slots__，无校验）。只有接口边界的请求体才经过 Pydantic 校验
+    """
+
+    __slots__ = ("id", "title", "completed", "list_id", "completed_at", "position")
+
+    def __init__(
+        self, id: str, title: str, completed: bool = False, list_id: str = "default",
+        completed_at: Optional[float] = None,
+    ):
+        self.id = id
+        self.title = title
+        self.completed = completed
+        # Only a handful of distinct list ids exist, so share one string object per list
+        self.list_id = sys.intern(list_id)
+        # Unix timestamp of when the task was checked off; drives archiving
+        self.completed_at = completed_at
+        # Creation order within the process, assigned by the store (not persisted)
+        self.position: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TaskRecord":
+        return cls(
+            data["id"], data["title"], bool(data.get("completed", False)), data.get("list_id", "default"),
+            data.get("completed_at"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "title": self.title, "completed": self.completed, "list_id": self.list_id,
+            "completed_at": self.completed_at,
+        }
+
+
+class ListRecord:
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: str, name: str):
+        self.id = sys.intern(id)
+        self.name = name
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ListRecord":
+        return cls(data["id"], data["name"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "name": self.name}
+
+
+class _StatusRun:
+    """
+    某清单中同一完成状态的任务，按创建顺序（position）有序，支持二分定位游标
+    """
+
+    __slots__ = ("positions", "ids")
+
+    def __init__(self):
+        # Parallel lists, both sorted by position
+        self.positions: List[int] = []
+        self.ids: List[str] = []
+
+    def add(self, position: int, task_id: str):
+        if not self.positions or position > self.positions[-1]:
+            # New tasks always come last
+            self.positions.append(position)
+            self.ids.append(task_id)
+            return
+        i = bisect.bisect_left(self.positions, position)
+        self.positions.insert(i, position)
+        self.ids.insert(i, task_id)
+
+    def remove(self, position: int):
+        i = bisect.bisect_left(self.positions, position)
+        if i < len(self.positions) and self.positions[i] == position:
+            del self.positions[i]
+            del self.ids[i]
+
+    def iter_from(self, tag: int, cursor: Optional[Tuple[int, int]], desc: bool) -> Iterator[Tuple[int, int, str]]:
+        """
+        从游标之后（desc 时为之前）开始依次给出 (tag, position, id)
+        """
+        positions, ids = self.positions, self.ids
+        if desc:
+            end = len(positions)
+            if cursor is not None:
+                if cursor[0] < tag:
+                    return
+                if cursor[0] == tag:
+                    end = bisect.bisect_left(positions, cursor[1])
+            for i in range(end - 1, -1, -1):
+                yield tag, positions[i], ids[i]
+        else:
+            start = 0
+            if cursor is not None:
+                if cursor[0] > tag:
+                    return
+                if cursor[0] == tag:
+                    start = bisect.bisect_right(positions, cursor[1])
+            for i in range(start, len(positions)):
+                yield tag, positions[i], ids[i]
+
+
+class TaskStore:
+    """
+    内存任务仓库：id → 任务的哈希索引 + list_id → 有序任务 id 的清单索引。
+    按 id 查找、更新、删除为 O(1)，按清单读取只与该清单的任务数相关，各清单的任务计数随修改增量维护。
+    清单的任务在第一次被访问时才从存储加载。
+    每次修改递增 revision，并在变更日志中记录，供增量同步（changes_since）使用
+    """
+
+    def __init__(
+        self,
+        loader: Optional[Callable[[str], Iterable[Dict[str, Any]]]] = None,
+        locator: Optional[Callable[[str], Optional[str]]] = None,
+        counter: Optional[Callable[[List[str]], Dict[str, Tuple[int, int]]]] = None,
+    ):
+        # loader(list_id) returns the stored tasks of one list, locator(task_id) the list a task is in,
+        # counter(list_ids) the stored (open, completed) counts without loading any task
+        self.loader = loader
+        self.locator = locator
+        self.counter = counter
+        self.tasks: Dict[str, TaskRecord] = {}
+        self.lists: Dict[str, ListRecord] = {}
+        # Insertion-ordered dicts used as ordered sets: O(1) removal, ordered iteration
+        self.list_index: Dict[str, Dict[str, None]] = {}
+        # list_id -> (open, completed) runs in creation order, for filtered and paged reads
+        self.status_index: Dict[str, Tuple[_StatusRun, _StatusRun]] = {}
+        self.next_position = 0
+        # list_id -> [open, completed] of loaded lists, updated on every mutation
+        self.counts: Dict[str, List[int]] = {}
+        # Stored counts of lists not loaded yet, fetched once on first use. Unloaded lists
+        # cannot change (every task mutation loads its list first), so these stay valid.
+        self.stored_counts: Dict[str, Tuple[int, int]] = {}
+        # Title search index over the loaded lists, filled in as each list loads
+        self.search = SearchIndex()
+        self.loaded: Set[str] = set()
+
+        # Revisions restart with every process; the epoch tells clients when that happened
+        self.epoch = uuid.uuid4().hex[:8]
+        self.revision = 0
+        # (kind, id) -> (revision, lists affected), most recently changed last
+        self.changelog: "OrderedDict[Tuple[str, str], Tuple[int, FrozenSet[str]]]" = OrderedDict()
+        # Changes at or below this revision have been dropped from the log
+        self.changelog_floor = 0
+        # Revision of the last change per list, and of the last change to the lists themselves
+        self.list_revisions: Dict[str, int] = {}
+        self.lists_revision = 0
+        # Called as on_change(kind, id, list_id, revision) after every mutation
+        self.on_change: Optional[Callable[[str, str, str, int], None]] = None
+
+    def load(self, lists: Iterable[Dict[str, Any]]):
+        """
+        从存储加载可信数据：直接构造记录，不做校验。这里只加载清单，任务按清单延迟加载
+        """
+        self.tasks = {}
+        self.lists = {}
+        self.list_index = {}
+        self.status_index = {}
+        self.counts = {}
+        self.stored_counts = {}
+        self.search = SearchIndex()
+        self.loaded = set()
+        for data in lists:
+            self.add_list(ListRecord.from_dict(data))
+
+    def ensure_loaded(self, list_id: str):
+        if list_id in self.loaded:
+            return
+        self.loaded.add(list_id)
+        self.stored_counts.pop(list_id, None)
+        if self.loader is None:
+            return
+        for data in self.loader(list_id):
+            self._index(TaskRecord.from_dict(data))
+
+    def ensure_all_loaded(self):
+        for list_id in list(self.lists):
+            self.ensure_loaded(list_id)
+
+    def is_loaded(self, list_id: str) -> bool:
+        return list_id in self.loaded
+
+    def unloaded_lists(self) -> List[str]:
+        return [list_id for list_id in self.lists if list_id not in self.loaded]
+
+    # --- Lists ---
+
+    def get_list(self, list_id: str) -> Optional[ListRecord]:
+        return self.lists.get(list_id)
+
+    def all_lists(self) -> List[ListRecord]:
+        return list(self.lists.values())
+
+    def add_list(self, task_list: ListRecord):
+        self.lists[task_list.id] = task_list
+        self._record("list", task_list.id, task_list.id)
+
+    def insert_list_first(self, task_list: ListRecord):
+        self.lists = {task_list.id: task_list, **self.lists}
+        self._record("list", task_list.id, task_list.id)
+
+    def remove_list(self, list_id: str) -> Optional[ListRecord]:
+        """
+        删除清单及其下所有任务，代价只与该清单已加载的任务数相关
+        """
+        task_list = self.lists.pop(list_id, None)
+        for task_id in self.list_index.pop(list_id, {}):
+            task = self.tasks.pop(task_id)
+            self.search.remove(task_id, task.title)
+        self.status_index.pop(list_id, None)
+        self.counts.pop(list_id, None)
+        # Stays "loaded" and empty: the stored rows may outlive the list until the delete is flushed,
+        # and a list re-created under this id must not pick them up
+        self.loaded.add(list_id)
+        self.stored_counts.pop(list_id, None)
+        if task_list is not None:
+            # Clients drop a deleted list's tasks themselves, so its tasks need no tombstones
+            self._record("list", list_id, list_id)
+        return task_list
+
+    # --- Tasks ---
+
+    def get_task(self, task_id: str) -> Optional[TaskRecord]:
+        task = self.tasks.get(task_id)
+        if task is None and self.locator is not None and not self.loaded.issuperset(self.lists):
+            # The task may sit in a list that has not been opened yet
+            list_id = self.locator(task_id)
+            if list_id is not None and list_id not in self.loaded:
+                self.ensure_loaded(list_id)
+                task = self.tasks.get(task_id)
+        return task
+
+    def all_tasks(self) -> List[TaskRecord]:
+        self.ensure_all_loaded()
+        return list(self.tasks.values())
+
+    def loaded_tasks(self) -> List[TaskRecord]:
+        return list(self.tasks.values())
+
+    def tasks_in_list(self, list_id: str) -> List[TaskRecord]:
+        self.ensure_loaded(list_id)
+        tasks = self.tasks
+        return [tasks[task_id] for task_id in self.list_index.get(list_id, ())]
+
+    def add_task(self, task: TaskRecord):
+        # Pull in the list's stored tasks first so the new one lands after them
+        self.ensure_loaded(task.list_id)
+        self._index(task)
+        self._record("task", task.id, task.list_id)
+
+    def _index(self, task: TaskRecord):
+        self.tasks[task.id] = task
+        self.list_index.setdefault(task.list_id, {})[task.id] = None
+        task.position = self.next_position
+        self.next_position += 1
+        runs = self.status_index.get(task.list_id)
+        if runs is None:
+            runs = self.status_index[task.list_id] = (_StatusRun(), _StatusRun())
+        runs[task.completed].add(task.position, task.id)
+        counts = self.counts.get(task.list_id)
+        if counts is None:
+            counts = self.counts[task.list_id] = [0, 0]
+        counts[task.completed] += 1
+        self.search.add(task.id, task.title)
+
+    def replace_task(self, task_id: str, task: TaskRecord) -> Optional[TaskRecord]:
+        old = self.get_task(task_id)
+        if old is None:
+            return None
+        if task.id == task_id and task.list_id == old.list_id:
+            # Same slot in both indexes, so the task keeps its position
+            self.tasks[task_id] = task
+            task.position = old.position
+            if task.completed != old.completed:
+                runs = self.status_index[task.list_id]
+                runs[old.completed].remove(old.position)
+                runs[task.completed].add(task.position, task_id)
+                counts = self.counts[task.list_id]
+                counts[old.completed] -= 1
+                counts[task.completed] += 1
+            if task.title != old.title:
+                self.search.remove(task_id, old.title)
+                self.search.add(task_id, task.title)
+            self._record("task", task_id, task.list_id)
+        else:
+            self.remove_task(task_id)
+            self.add_task(task)
+        return old
+
+    def remove_task(self, task_id: str) -> Optional[TaskRecord]:
+        task = self.get_task(task_id)
+        if task is not None:
+            del self.tasks[task_id]
+            index = self.list_index.get(task.list_id)
+            if index is not None:
+                index.pop(task_id, None)
+                if not index:
+                    del self.list_index[task.list_id]
+            runs = self.status_index.get(task.list_id)
+            if runs is not None:
+                runs[task.completed].remove(task.position)
+                if not runs[0].positions and not runs[1].positions:
+                    del self.status_index[task.list_id]
+            counts = self.counts.get(task.list_id)
+            if counts is not None:
+                counts[task.completed] -= 1
+            self.search.remove(task_id, task.title)
+            self._record("task", task_id, task.list_id)
+        return task
+
+    def list_counts(self) -> Dict[str, Tuple[int, int]]:
+        """
+        每个清单的 (未完成, 已完成) 任务数。首次调用时向存储查询未加载清单的计数，之后为 O(清单数)
+        """
+        missing = [l for l in self.lists if l not in self.loaded and l not in self.stored_counts]
+        if missing and self.counter is not None:
+            self.stored_counts.update(self.counter(missing))
+        result = {}
+        for list_id in self.lists:
+            if list_id in self.loaded:
+                counts = self.counts.get(list_id, (0, 0))
+            else:
+                counts = self.stored_counts.get(list_id, (0, 0))
+            result[list_id] = (counts[0], counts[1])
+        return result
+
+    def query_tasks(
+        self, list_id: str, completed: Optional[bool] = None, open_first: bool = False, desc: bool = False,
+        cursor: Optional[Tuple[int, int]] = None, limit: Optional[int] = None,
+    ) -> Tuple[List[TaskRecord], Optional[Tuple[int, int]]]:
+        """
+        按维护好的状态索引读取一页任务，不做排序：默认按创建顺序，open_first 时未完成在前。
+        游标为上一页最后一条的 (分组, position)，返回本页任务与下一页游标（没有更多时为 None）
+        """
+        self.ensure_loaded(list_id)
+        runs = self.status_index.get(list_id)
+        if runs is None:
+            return [], None
+        open_run, done_run = runs
+        if completed is not None:
+            entries = runs[completed].iter_from(0, cursor, desc)
+        elif open_first:
+            parts = [open_run.iter_from(0, cursor, desc), done_run.iter_from(1, cursor, desc)]
+            entries = itertools.chain(*(reversed(parts) if desc else parts))
+        else:
+            # Both runs are in creation order, so a merge restores it without sorting
+            entries = heapq.merge(open_run.iter_from(0, cursor, desc), done_run.iter_from(0, cursor, desc), reverse=desc)
+
+        page = list(itertools.islice(entries, limit + 1)) if limit is not None else list(entries)
+        next_cursor = None
+        if limit is not None and len(page) > limit:
+            page = page[:limit]
+            next_cursor = page[-1][:2] if page else None
+        tasks = self.tasks
+        return [tasks[task_id] for _, _, task_id in page], next_cursor
+
+    def search_tasks(
+        self, query: str, list_id: Optional[str] = None, offset: int = 0, limit: int = 20,
+    ) -> Tuple[List[TaskRecord], int]:
+        """
+        标题搜索：倒排索引求出包含全部词项的任务，再只对命中的任务排序。
+        只覆盖已加载的清单，不为搜索加载清单（unloaded_lists 为空时才是全部任务）。
+        排序：整句连续出现的在前，其次未完成、标题较短、较新的。返回 (本页任务, 命中总数)
+        """
+        tasks = self.tasks
+        hits = [tasks[task_id] for task_id in self.search.match(query)]
+        if list_id is not None:
+            hits = [t for t in hits if t.list_id == list_id]
+        # With a single term every hit already contains the query as typed
+        phrase = normalize(query).strip() if len(tokenize(query)) > 1 else None
+
+        def rank(task: TaskRecord):
+            title = task.title
+            return (phrase is not None and phrase not in normalize(title), task.completed, len(title), -task.position)
+
+        top = heapq.nsmallest(offset + limit, hits, key=rank)
+        return top[offset:], len(hits)
+
+    # --- Change log ---
+
+    def _record(self, kind: str, record_id: str, list_id: str):
+        self.revision += 1
+        self.list_revisions[list_id] = self.revision
+        if kind == "list":
+            self.lists_revision = self.revision
+        key = (kind, record_id)
+        previous = self.changelog.pop(key, None)
+        lists = frozenset((list_id,))
+        if previous is not None:
+            # Keep every list the record passed through, so each gets its tombstone
+            lists = lists | previous[1]
+        self.changelog[key] = (self.revision, lists)
+        while len(self.changelog) > CHANGELOG_LIMIT:
+            _, (rev, _) = self.changelog.popitem(last=False)
+            self.changelog_floor = rev
+        if self.on_change is not None:
+            self.on_change(kind, record_id, list_id, self.revision)
+
+    def list_revision(self, list_id: str) -> int:
+        return self.list_revisions.get(list_id, 0)
+
+    def changes_since(self, since: int, epoch: Optional[str] = None, list_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        返回 since 之后的变更：新增/修改的记录与已删除的 id。
+        since 为 0、epoch 不匹配或变更日志已截断时返回全量数据并置 reset
+        """
+        reset = since <= 0 or epoch != self.epoch or since < self.changelog_floor or since > self.revision
+        result = {
+            "epoch": self.epoch, "revision": self.revision, "reset": reset,
+            "tasks": [], "deleted": [], "lists": [], "deleted_lists": [],
+        }
+        if reset:
+            tasks = self.tasks_in_list(list_id) if list_id else self.all_tasks()
+            result["tasks"] = [t.to_dict() for t in tasks]
+            result["lists"] = [l.to_dict() for l in self.lists.values()]
+            return result
+
+        # Walk back from the newest change; an idle poll stops at the first entry
+        for (kind, record_id), (rev, lists) in reversed(self.changelog.items()):
+            if rev <= since:
+                break
+            if kind == "list":
+                task_list = self.lists.get(record_id)
+                if task_list is not None:
+                    result["lists"].append(task_list.to_dict())
+                else:
+                    result["deleted_lists"].append(record_id)
+                continue
+            if list_id is not None and list_id not in lists:
+                continue
+            task = self.tasks.get(record_id)
+            if task is not None and (list_id is None or task.list_id == list_id):
+                result["tasks"].append(task.to_dict())
+            else:
+                result["deleted"].append(record_id)
+        # Oldest first, so clients append new tasks in creation order
+        result["tasks"].reverse()
+        result["lists"].reverse()
+        return result
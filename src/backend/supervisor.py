@@ -0,0 +1,175 @@
+import multiprocessing
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+from src.shared.config import BACKEND_PORT, BACKEND_READY_TIMEOUT_MS, SOCKET_FILE, USE_UNIX_SOCKET
+
+# Seconds between /health probes of the running child
+HEALTH_PROBE_INTERVAL = 2.0
+HEALTH_PROBE_TIMEOUT = 2.0
+# Consecutive failed probes before a running but unresponsive child is replaced
+MAX_PROBE_FAILURES = 3
+# Delay before each restart, doubling while the child keeps failing
+RESTART_BACKOFF_MIN = 1.0
+RESTART_BACKOFF_MAX = 30.0
+# A child that stays healthy this long resets the backoff
+STABLE_AFTER = 60.0
+# How long a clean stop may take (uvicorn shutdown plus writing out queued changes)
+STOP_TIMEOUT = 10.0
+
+
+def run_backend_process(conn, port: int):
+    """
+    子进程入口：运行 uvicorn，就绪后通过管道报告地址；收到 stop 或父进程退出（管道关闭）时正常停止
+    """
+    from src.backend import main as backend
+
+    def report_ready():
+        url = backend.wait_for_backend(BACKEND_READY_TIMEOUT_MS / 1000)
+        try:
+            conn.send(("ready", url))
+        except OSError:
+            pass
+
+    def watch_parent():
+        try:
+            while conn.recv() != "stop":
+                pass
+        except (EOFError, OSError):
+            # The parent is gone: shut down cleanly rather than linger
+            pass
+        backend.stop_backend()
+
+    threading.Thread(target=report_ready, name="floatdo-ready", daemon=True).start()
+    threading.Thread(target=watch_parent, name="floatdo-parent", daemon=True).start()
+    backend.start_backend(port=port)
+
+
+class BackendSupervisor:
+    """
+    在独立子进程中运行后端：界面线程不再与后端争用 GIL，后端崩溃也不会带走界面。
+    定期探测 /health，子进程退出或持续无响应时按退避间隔重启；stop 时让子进程写完数据后退出
+    """
+
+    def __init__(self, port: int = BACKEND_PORT):
+        # spawn everywhere: forking a process that already runs Qt threads is unsafe
+        self.ctx = multiprocessing.get_context("spawn")
+        self.port = port
+        self.url: Optional[str] = None
+        self.process = None
+        self.conn = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.http = None
+        self.stopping = threading.Event()
+        self.monitor: Optional[threading.Thread] = None
+
+    def start(self) -> Optional[str]:
+        """
+        启动子进程并等待就绪，返回客户端应使用的 base URL（超时或失败时为 None，监控线程会继续重试）
+        """
+        self._spawn()
+        self.monitor = threading.Thread(target=self._watch, name="floatdo-supervisor", daemon=True)
+        self.monitor.start()
+        return self.url
+
+    def stop(self):
+        self.stopping.set()
+        if self.monitor is not None:
+            self.monitor.join()
+            self.monitor = None
+        self._shutdown_child(graceful=True)
+        if self.http is not None:
+            self.http.close()
+            self.http = None
+
+    def _spawn(self):
+        parent_conn, child_conn = self.ctx.Pipe()
+        process = self.ctx.Process(
+            target=run_backend_process, args=(child_conn, self.port), name="floatdo-backend", daemon=True,
+        )
+        process.start()
+        # Only the child holds its end now, so the child sees EOF if this process dies
+        child_conn.close()
+        self.process, self.conn = process, parent_conn
+        self.started_at = time.monotonic()
+
+        url = None
+        try:
+            if parent_conn.poll(BACKEND_READY_TIMEOUT_MS / 1000):
+                _, url = parent_conn.recv()
+        except (EOFError, OSError):
+            # The child died during startup; the monitor restarts it
+            url = None
+        if url is None:
+            print(f"Error starting backend process: not ready after {BACKEND_READY_TIMEOUT_MS} ms")
+            return
+        port = urlsplit(url).port
+        if port is not None:
+            # Restarts reuse the port, so clients keep working with the same URL
+            self.port = port
+        self.url = url
+
+    def _probe(self) -> bool:
+        try:
+            if self.http is None:
+                # Imported here: only the process mode probes the backend from this side
+                import httpx
+                if USE_UNIX_SOCKET:
+                    self.http = httpx.Client(transport=httpx.HTTPTransport(uds=SOCKET_FILE), timeout=HEALTH_PROBE_TIMEOUT)
+                else:
+                    self.http = httpx.Client(timeout=HEALTH_PROBE_TIMEOUT)
+            response = self.http.get(f"{self.url}/health")
+            return response.status_code == 200
+        except Exception:
+            return False
+
+    def _watch(self):
+        failures = 0
+        delay = RESTART_BACKOFF_MIN
+        while not self.stopping.wait(HEALTH_PROBE_INTERVAL):
+            process = self.process
+            alive = process is not None and process.is_alive()
+            if alive and self.url is not None and self._probe():
+                failures = 0
+                if time.monotonic() - self.started_at > STABLE_AFTER:
+                    delay = RESTART_BACKOFF_MIN
+                continue
+            if alive:
+                failures += 1
+                if failures < MAX_PROBE_FAILURES:
+                    continue
+                print(f"Backend process not responding after {failures} health checks, restarting")
+            else:
+                exit_code = process.exitcode if process is not None else None
+                print(f"Backend process exited (code {exit_code}), restarting in {delay:.0f} s")
+            self._shutdown_child(graceful=False)
+            if self.stopping.wait(delay):
+                return
+            delay = min(delay * 2, RESTART_BACKOFF_MAX)
+            failures = 0
+            self.restarts += 1
+            self._spawn()
+
+    def _shutdown_child(self, graceful: bool):
+        process, conn = self.process, self.conn
+        self.process = self.conn = None
+        if process is None:
+            return
+        if process.is_alive():
+            if graceful:
+                # The child stops uvicorn, whose lifespan writes out queued changes
+                try:
+                    conn.send("stop")
+                except OSError:
+                    pass
+                process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join(2)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        conn.close()
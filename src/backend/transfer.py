@@ -0,0 +1,200 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Records per write when importing; bounds memory and the size of one storage commit
+IMPORT_CHUNK_SIZE = 500
+# How many bad lines an import reports back
+MAX_REPORTED_ERRORS = 20
+
+
+def encode_record(kind: str, data: Dict[str, Any]) -> str:
+    return json.dumps({"type": kind, **data}, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+
+def decode_record(line) -> Tuple[str, Dict[str, Any]]:
+    """
+    解析一行导入数据，返回 (类型, 规范化后的记录)；格式不对时抛出 ValueError
+    """
+    try:
+        data = json.loads(line)
+        kind = data.pop("type")
+        if kind == "list":
+            record = {"id": str(data["id"]), "name": str(data["name"])}
+        elif kind in ("task", "archived_task"):
+            completed = data.get("completed", False)
+            completed_at = data.get("completed_at")
+            # Checked rather than coerced: bool("false") is True, and a non-numeric
+            # completed_at would break the archive sweep on every later start
+            if not isinstance(completed, bool):
+                raise ValueError(f"completed must be true or false, got {completed!r}")
+            if completed_at is not None and (isinstance(completed_at, bool) or not isinstance(completed_at, (int, float))):
+                raise ValueError(f"completed_at must be a timestamp, got {completed_at!r}")
+            record = {
+                "id": str(data["id"]), "title": str(data["title"]), "completed": completed,
+                "list_id": str(data.get("list_id", "default")), "completed_at": completed_at,
+            }
+        else:
+            raise ValueError(f"unknown record type {kind!r}")
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"missing or invalid field {e}")
+    return kind, record
+
+
+def export_lines(
+    lists: List[Dict[str, Any]],
+    list_tasks: Callable[[str], Iterable[Dict[str, Any]]],
+    archived: Optional[Iterable[Dict[str, Any]]] = None,
+    orphan_list_ids: Iterable[str] = (),
+) -> Iterator[str]:
+    """
+    导出为 NDJSON：先所有清单，再逐个清单的任务，最后是归档任务。逐条生成，不在内存中拼出整份数据。
+    orphan_list_ids 是任务引用了、但没有清单记录的清单 id，这些任务同样导出
+    """
+    for data in lists:
+        yield encode_record("list", data)
+    for list_id in itertools.chain((data["id"] for data in lists), orphan_list_ids):
+        for task in list_tasks(list_id):
+            yield encode_record("task", task)
+    if archived is not None:
+        for task in archived:
+            yield encode_record("archived_task", task)
+
+
+class ImportReport:
+    """
+    导入结果统计，错误只保留前若干条
+    """
+
+    def __init__(self):
+        self.lists = 0
+        self.tasks = 0
+        self.archived = 0
+        self.skipped = 0
+        self.errors: List[str] = []
+        self.error_count = 0
+
+    def error(self, line_no: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line_no}: {message}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lists": self.lists, "tasks": self.tasks, "archived": self.archived, "skipped": self.skipped,
+            "error_count": self.error_count, "errors": self.errors,
+        }
+
+
+def iter_chunks(lines: Iterable, report: ImportReport) -> Iterator[List[Tuple[str, Dict[str, Any]]]]:
+    chunk = []
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            chunk.append(decode_record(line))
+        except ValueError as e:
+            report.error(line_no, str(e))
+            continue
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def archived_ids(archive) -> Set[str]:
+    # Re-importing a backup must not duplicate the archive; only ids are kept
+    return {task["id"] for task in archive.iter_tasks()}
+
+
+# --- Offline CLI (FloatDo must not be running) ---
+
+def export_offline(storage, archive, out, include_archive: bool = True):
+    lists = storage.load_lists()
+    archived = archive.iter_tasks() if include_archive else None
+    for line in export_lines(lists, storage.iter_list_tasks, archived, storage.orphan_list_ids()):
+        out.write(line)
+
+
+def import_offline(storage, archive, lines: Iterable[str]) -> ImportReport:
+    report = ImportReport()
+    known_archived = None
+    for chunk in iter_chunks(lines, report):
+        ops = []
+        to_archive = []
+        for kind, data in chunk:
+            if kind == "list":
+                ops.append({"op": "put_list", "list": data})
+                report.lists += 1
+            elif kind == "task":
+                old_list = storage.locate_task(data["id"])
+                if old_list is not None and old_list != data["list_id"]:
+                    ops.append({"op": "delete_task", "id": data["id"], "list_id": old_list})
+                ops.append({"op": "put_task", "task": data})
+                report.tasks += 1
+            else:
+                if known_archived is None:
+                    known_archived = archived_ids(archive)
+                if data["id"] in known_archived:
+                    report.skipped += 1
+                    continue
+                known_archived.add(data["id"])
+                to_archive.append(data)
+                report.archived += 1
+        storage.apply(ops)
+        archive.append(to_archive)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.backend.transfer",
+        description="FloatDo 数据导入导出（NDJSON），直接读写数据目录，请先退出 FloatDo",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_cmd = commands.add_parser("export", help="导出全部清单和任务")
+    export_cmd.add_argument("file", help="输出文件，- 表示标准输出")
+    export_cmd.add_argument("--no-archive", action="store_true", help="不导出归档任务")
+    import_cmd = commands.add_parser("import", help="从 NDJSON 文件导入（同 id 覆盖）")
+    import_cmd.add_argument("file", help="输入文件，- 表示标准输入")
+    args = parser.parse_args(argv)
+
+    from src.shared.instance import instance_running
+    if instance_running():
+        # Its unflushed changes and this run's writes would overwrite each other
+        print("FloatDo 正在运行，请先退出再导入导出（或在应用内导入导出）", file=sys.stderr)
+        return 1
+
+    # Same storage engine and data files the app uses
+    from src.backend.archive import TaskArchive
+    from src.backend.service import ARCHIVE_FILE, create_storage
+    storage = create_storage()
+    archive = TaskArchive(ARCHIVE_FILE)
+
+    storage.open()
+    try:
+        if args.command == "export":
+            if args.file == "-":
+                export_offline(storage, archive, sys.stdout, not args.no_archive)
+            else:
+                with open(args.file, 'w', encoding='utf-8') as out:
+                    export_offline(storage, archive, out, not args.no_archive)
+        else:
+            if args.file == "-":
+                report = import_offline(storage, archive, sys.stdin)
+            else:
+                with open(args.file, 'r', encoding='utf-8') as f:
+                    report = import_offline(storage, archive, f)
+            print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    finally:
+        storage.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    sys.exit(main())
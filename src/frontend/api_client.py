@@ -1,17 +1,55 @@
-import httpx
-from typing import List, Dict, Any, Optional
+import json
+import socket
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from src.shared.config import BACKEND_MODE, BACKEND_HOST, BACKEND_PORT, SOCKET_FILE, USE_UNIX_SOCKET
 
-BASE_URL = "http://127.0.0.1:8000"
+BASE_URL = f"http://{BACKEND_HOST}:{BACKEND_PORT}"
+
+def make_http_client(base_url: Optional[str] = None, **kwargs) -> "httpx.Client":
+    """
+    按配置连接后端：Unix 域套接字（无端口占用、仅本用户可访问）或 TCP。
+    base_url 为后端就绪时报告的地址（例如系统分配的端口），不给时按配置
+    """
+    # Imported on first use: embedded mode never loads httpx
+    import httpx
+    if USE_UNIX_SOCKET:
+        # The host part only fills the Host header
+        return httpx.Client(transport=httpx.HTTPTransport(uds=SOCKET_FILE), base_url=base_url or "http://floatdo", **kwargs)
+    return httpx.Client(base_url=base_url or BASE_URL, **kwargs)
 
 class ApiClient:
-    def __init__(self):
-        self.client = httpx.Client(base_url=BASE_URL)
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url
+        self.client = make_http_client(base_url)
+        # (path, params) -> (ETag, decoded body) of the last full response
+        self.etag_cache: Dict[Any, Any] = {}
+        self.event_response: Optional["httpx.Response"] = None
+
+    def _get_cached(self, path: str, params: Optional[Dict[str, Any]] = None, read=None) -> Any:
+        """
+        条件请求：带上 If-None-Match，304 时直接复用上次解析好的结果（默认是 JSON 正文，给出 read 时为 read(response)）
+        """
+        key = (path, tuple(sorted((params or {}).items())))
+        cached = self.etag_cache.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else None
+        response = self.client.get(path, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        response.raise_for_status()
+        body = read(response) if read else response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            self.etag_cache[key] = (etag, body)
+        return body
 
-    def get_lists(self) -> List[Dict[str, Any]]:
+    def get_lists(self, with_counts: bool = False) -> List[Dict[str, Any]]:
+        """
+        with_counts 为 True 时每个清单带 open / completed 任务数
+        """
         try:
-            response = self.client.get("/lists")
-            response.raise_for_status()
-            return response.json()
+            params = {"with_counts": "true"} if with_counts else None
+            # Shallow copy so callers cannot alter the cached body
+            return list(self._get_cached("/lists", params))
         except Exception as e:
             print(f"API Error (get_lists): {e}")
             return []
@@ -40,13 +78,148 @@ class ApiClient:
             params = {}
             if list_id:
                 params["list_id"] = list_id
-            response = self.client.get("/tasks", params=params)
-            response.raise_for_status()
-            return response.json()
+            return list(self._get_cached("/tasks", params))
         except Exception as e:
             print(f"API Error (get_tasks): {e}")
             return []
 
+    def get_task_page(
+        self, list_id: str, completed: Optional[bool] = None, order: str = "created", desc: bool = False,
+        limit: int = 50, cursor: Optional[str] = None,
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """
+        分页读取任务（由后端过滤和排序），返回 (本页任务, 下一页游标)，没有更多时游标为 None；
+        出错时返回 None（调用方保留当前状态）
+        """
+        def read_page(response):
+            return response.json(), response.headers.get("X-Next-Cursor")
+
+        try:
+            params: Dict[str, Any] = {"list_id": list_id, "order": order, "limit": limit}
+            if completed is not None:
+                params["completed"] = "true" if completed else "false"
+            if desc:
+                params["desc"] = "true"
+            if cursor:
+                # Pages further down are fetched once each; only first pages are polled
+                params["cursor"] = cursor
+                response = self.client.get("/tasks", params=params)
+                response.raise_for_status()
+                return read_page(response)
+            tasks, next_cursor = self._get_cached("/tasks", params, read_page)
+            return list(tasks), next_cursor
+        except Exception as e:
+            print(f"API Error (get_task_page): {e}")
+            return None
+
+    def search_tasks(self, query: str, list_id: Optional[str] = None, offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """
+        搜索任务标题，返回 {"tasks", "total", "next_offset", "incomplete"}（incomplete 表示还有清单未加入索引）
+        """
+        try:
+            params: Dict[str, Any] = {"q": query, "offset": offset, "limit": limit}
+            if list_id:
+                params["list_id"] = list_id
+            response = self.client.get("/search", params=params)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"API Error (search_tasks): {e}")
+            return {"tasks": [], "total": 0, "next_offset": None, "incomplete": False}
+
+    def export_data(self, path: str, include_archive: bool = True) -> bool:
+        """
+        导出全部数据到本地 NDJSON 文件（边下载边写入）
+        """
+        try:
+            params = {"include_archive": "true" if include_archive else "false"}
+            with self.client.stream("GET", "/export", params=params, timeout=None) as response:
+                response.raise_for_status()
+                with open(path, 'wb') as f:
+                    for chunk in response.iter_bytes():
+                        f.write(chunk)
+            return True
+        except Exception as e:
+            print(f"API Error (export_data): {e}")
+            return False
+
+    def import_data(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        从 NDJSON 文件导入（边读边上传），返回导入统计
+        """
+        try:
+            def chunks():
+                with open(path, 'rb') as f:
+                    while True:
+                        chunk = f.read(64 * 1024)
+                        if not chunk:
+                            return
+                        yield chunk
+            response = self.client.post(
+                "/import", content=chunks(), headers={"Content-Type": "application/x-ndjson"}, timeout=None,
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"API Error (import_data): {e}")
+            return None
+
+    def get_changes(self, since: int = 0, epoch: Optional[str] = None, list_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        增量同步：返回 since 之后的变更；出错时返回 None（调用方保留当前状态）
+        """
+        try:
+            params = {"since": since}
+            if epoch:
+                params["epoch"] = epoch
+            if list_id:
+                params["list_id"] = list_id
+            response = self.client.get("/changes", params=params)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"API Error (get_changes): {e}")
+            return None
+
+    def iter_events(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        订阅后端推送（/events，SSE），逐条产出 (事件名, 数据)；连接断开时抛出异常或结束
+        """
+        import httpx
+        # A dedicated client: the stream stays open indefinitely and has no read timeout
+        with make_http_client(self.base_url, timeout=httpx.Timeout(5.0, read=None)) as client:
+            try:
+                with client.stream("GET", "/events") as response:
+                    self.event_response = response
+                    response.raise_for_status()
+                    event = "message"
+                    for line in response.iter_lines():
+                        if line.startswith("event:"):
+                            event = line[len("event:"):].strip()
+                        elif line.startswith("data:"):
+                            yield event, json.loads(line[len("data:"):])
+                        elif not line:
+                            event = "message"
+            finally:
+                self.event_response = None
+
+    def close_event_stream(self):
+        """
+        从其他线程中断 iter_events：关闭连接的 socket 才能唤醒阻塞中的读取
+        """
+        response = self.event_response
+        if response is None:
+            return
+        try:
+            stream = response.extensions.get("network_stream")
+            sock = stream.get_extra_info("socket") if stream is not None else None
+            if sock is not None:
+                sock.shutdown(socket.SHUT_RDWR)
+            else:
+                response.close()
+        except Exception as e:
+            print(f"API Error (close_event_stream): {e}")
+
     def add_task(self, task_id: str, title: str, list_id: str = "default") -> bool:
         try:
             payload = {"id": task_id, "title": title, "completed": False, "list_id": list_id}
@@ -57,6 +230,33 @@ class ApiClient:
             print(f"API Error (add_task): {e}")
             return False
 
+    def batch_tasks(self, ops: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        批量提交 create/update/delete 操作，一次往返；全部成功或全部不执行。
+        返回后端的逐条结果，网络错误时返回 None
+        """
+        try:
+            response = self.client.post("/tasks/batch", json={"ops": ops})
+            if response.status_code == 409:
+                return response.json()
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"API Error (batch_tasks): {e}")
+            return None
+
+    def patch_task(self, task_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        局部更新任务，只发送要修改的字段（如 {"completed": True}），返回更新后的任务
+        """
+        try:
+            response = self.client.patch(f"/tasks/{task_id}", json=fields)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"API Error (patch_task): {e}")
+            return None
+
     def delete_task(self, task_id: str) -> bool:
         try:
             response = self.client.delete(f"/tasks/{task_id}")
@@ -68,13 +268,7 @@ class ApiClient:
 
     def update_task(self, task_id: str, title: str, completed: bool, list_id: str = "default") -> bool:
         try:
-            # Note: We need to preserve list_id. 
-            # In a real app, we might fetch first or backend handles partial updates.
-            # Here, we assume the frontend knows the list_id or we just send what we have.
-            # Ideally, update endpoints should be PATCH or we fetch the full object.
-            # For simplicity, we trust the caller passes the right list_id or we use default.
-            # Actually, to be safe, we should probably let the backend handle it or fetch first.
-            # But let's assume the frontend passes the current list_id.
+            # Replaces the whole task; use patch_task to change single fields
             payload = {"id": task_id, "title": title, "completed": completed, "list_id": list_id}
             response = self.client.put(f"/tasks/{task_id}", json=payload)
             response.raise_for_status()
@@ -82,3 +276,33 @@ class ApiClient:
         except Exception as e:
             print(f"API Error (update_task): {e}")
             return False
+
+    def get_archive(self, list_id: Optional[str] = None, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        try:
+            params = {"offset": offset, "limit": limit}
+            if list_id:
+                params["list_id"] = list_id
+            response = self.client.get("/archive", params=params)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"API Error (get_archive): {e}")
+            return {"tasks": [], "next_offset": None}
+
+    def restore_task(self, task_id: str) -> bool:
+        try:
+            response = self.client.post(f"/archive/{task_id}/restore")
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            print(f"API Error (restore_task): {e}")
+            return False
+
+def create_api_client(base_url: Optional[str] = None):
+    """
+    按配置创建客户端：embedded 模式直接调用进程内的服务层，http 模式通过 HTTP 访问 base_url 处的后端
+    """
+    if BACKEND_MODE == "embedded":
+        from src.frontend.local_client import LocalApiClient
+        return LocalApiClient()
+    return ApiClient(base_url)
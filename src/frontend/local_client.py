@@ -0,0 +1,211 @@
+import queue
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from src.backend.service import get_service
+from src.backend.transfer import ImportReport, export_lines, iter_chunks
+
+# Events a slow reader may fall behind by before it is told to resync, as for SSE subscribers
+# (not imported from src.backend.events, which would load asyncio for nothing)
+EVENT_QUEUE_SIZE = 1000
+
+class LocalApiClient:
+    """
+    与 ApiClient 接口相同，但在同一进程内直接调用服务层：没有网络往返、JSON 编解码和 uvicorn
+    """
+
+    def __init__(self, service=None):
+        self.service = service or get_service()
+        self.event_queue: Optional[queue.Queue] = None
+
+    def get_lists(self, with_counts: bool = False) -> List[Dict[str, Any]]:
+        """
+        with_counts 为 True 时每个清单带 open / completed 任务数
+        """
+        try:
+            return self.service.get_lists(with_counts)
+        except Exception as e:
+            print(f"API Error (get_lists): {e}")
+            return []
+
+    def create_list(self, list_id: str, name: str) -> bool:
+        try:
+            self.service.create_list({"id": list_id, "name": name})
+            return True
+        except Exception as e:
+            print(f"API Error (create_list): {e}")
+            return False
+
+    def delete_list(self, list_id: str) -> bool:
+        try:
+            self.service.delete_list(list_id)
+            return True
+        except Exception as e:
+            print(f"API Error (delete_list): {e}")
+            return False
+
+    def get_tasks(self, list_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        try:
+            return self.service.get_tasks(list_id)
+        except Exception as e:
+            print(f"API Error (get_tasks): {e}")
+            return []
+
+    def get_task_page(
+        self, list_id: str, completed: Optional[bool] = None, order: str = "created", desc: bool = False,
+        limit: int = 50, cursor=None,
+    ) -> Optional[Tuple[List[Dict[str, Any]], Any]]:
+        """
+        分页读取任务，返回 (本页任务, 下一页游标)，没有更多时游标为 None；出错时返回 None。
+        同进程内游标就是索引位置本身，不需要编码
+        """
+        try:
+            return self.service.query_tasks(list_id, completed, order == "open_first", desc, cursor, limit)
+        except Exception as e:
+            print(f"API Error (get_task_page): {e}")
+            return None
+
+    def search_tasks(self, query: str, list_id: Optional[str] = None, offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """
+        搜索任务标题，返回 {"tasks", "total", "next_offset", "incomplete"}（incomplete 表示还有清单未加入索引）
+        """
+        try:
+            return self.service.search(query, list_id, offset, limit)
+        except Exception as e:
+            print(f"API Error (search_tasks): {e}")
+            return {"tasks": [], "total": 0, "next_offset": None, "incomplete": False}
+
+    def export_data(self, path: str, include_archive: bool = True) -> bool:
+        """
+        导出全部数据到本地 NDJSON 文件（逐行写入）
+        """
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                for line in export_lines(*self.service.export_source(include_archive)):
+                    f.write(line)
+            return True
+        except Exception as e:
+            print(f"API Error (export_data): {e}")
+            return False
+
+    def import_data(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        从 NDJSON 文件导入（逐批读取写入），返回导入统计
+        """
+        try:
+            report = ImportReport()
+            state = {"archived_ids": None}
+            with open(path, 'r', encoding='utf-8') as f:
+                for chunk in iter_chunks(f, report):
+                    self.service.import_chunk(chunk, report, state)
+            return report.to_dict()
+        except Exception as e:
+            print(f"API Error (import_data): {e}")
+            return None
+
+    def get_changes(self, since: int = 0, epoch: Optional[str] = None, list_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        增量同步：返回 since 之后的变更；出错时返回 None（调用方保留当前状态）
+        """
+        try:
+            return self.service.changes_since(since, epoch, list_id)
+        except Exception as e:
+            print(f"API Error (get_changes): {e}")
+            return None
+
+    def iter_events(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        订阅变更推送，逐条产出 (事件名, 数据)：先 hello，之后每次修改一条 change；close_event_stream 后结束
+        """
+        events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+        def deliver(event):
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                # The reader fell behind: replace its backlog with one resync request
+                with events.mutex:
+                    events.queue.clear()
+                events.put_nowait({"kind": "resync"})
+
+        self.event_queue = events
+        self.service.add_listener(deliver)
+        try:
+            yield "hello", self.service.hello()
+            while True:
+                event = events.get()
+                if event is None:
+                    return
+                yield "change", event
+        finally:
+            self.service.remove_listener(deliver)
+            self.event_queue = None
+
+    def close_event_stream(self):
+        """
+        从其他线程中断 iter_events
+        """
+        events = self.event_queue
+        if events is None:
+            return
+        with events.mutex:
+            events.queue.clear()
+        events.put_nowait(None)
+
+    def add_task(self, task_id: str, title: str, list_id: str = "default") -> bool:
+        try:
+            self.service.create_task({"id": task_id, "title": title, "completed": False, "list_id": list_id})
+            return True
+        except Exception as e:
+            print(f"API Error (add_task): {e}")
+            return False
+
+    def batch_tasks(self, ops: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        批量提交 create/update/delete 操作；全部成功或全部不执行，返回逐条结果
+        """
+        try:
+            return self.service.batch(ops)
+        except Exception as e:
+            print(f"API Error (batch_tasks): {e}")
+            return None
+
+    def patch_task(self, task_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        局部更新任务，只修改给出的字段（如 {"completed": True}），返回更新后的任务
+        """
+        try:
+            return self.service.patch_task(task_id, fields)
+        except Exception as e:
+            print(f"API Error (patch_task): {e}")
+            return None
+
+    def delete_task(self, task_id: str) -> bool:
+        try:
+            self.service.delete_task(task_id)
+            return True
+        except Exception as e:
+            print(f"API Error (delete_task): {e}")
+            return False
+
+    def update_task(self, task_id: str, title: str, completed: bool, list_id: str = "default") -> bool:
+        try:
+            # Replaces the whole task; use patch_task to change single fields
+            self.service.update_task(task_id, {"id": task_id, "title": title, "completed": completed, "list_id": list_id})
+            return True
+        except Exception as e:
+            print(f"API Error (update_task): {e}")
+            return False
+
+    def get_archive(self, list_id: Optional[str] = None, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        try:
+            return self.service.browse_archive(list_id, offset, limit)
+        except Exception as e:
+            print(f"API Error (get_archive): {e}")
+            return {"tasks": [], "next_offset": None}
+
+    def restore_task(self, task_id: str) -> bool:
+        try:
+            self.service.restore_task(task_id)
+            return True
+        except Exception as e:
+            print(f"API Error (restore_task): {e}")
+            return False
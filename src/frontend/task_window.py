@@ -7,10 +7,15 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, pyqtSignal, QPoint, QPropertyAnimation, QEasingCurve, QTimer, QSize, QThread
 from PyQt6.QtGui import QColor, QIcon, QFont, QPainter, QBrush, QPen, QAction
-from src.frontend.api_client import ApiClient
+from src.frontend.api_client import create_api_client
 from src.frontend.theme import theme_manager, Theme
 import uuid
 
+# Rows fetched at a time: the panel starts with one page and loads more as it is scrolled down
+TASK_PAGE_SIZE = 50
+# Largest page the backend serves
+MAX_TASK_PAGE = 1000
+
 class ModernCheckBox(QCheckBox):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -124,7 +129,9 @@ class ListMenuItemWidget(QWidget):
         
         # Checkmark + Name
         prefix = "✓ " if is_selected else "   "
-        self.label = QLabel(f"{prefix}{list_data['name']}")
+        # Pending tasks, when the backend sent counts
+        suffix = f" ({list_data['open']})" if list_data.get('open') else ""
+        self.label = QLabel(f"{prefix}{list_data['name']}{suffix}")
         self.label.setFont(QFont("Segoe UI", 10))
         
         layout.addWidget(self.label, 1) # Expand to push delete button to right
@@ -241,7 +248,7 @@ class CustomTitleBar(QWidget):
         """)
         
         # --- Lists Section ---
-        lists = task_window.api.get_lists()
+        lists = task_window.api.get_lists(with_counts=True)
         
         # Header for lists (Disabled action as label)
         list_header = QAction("我的清单", self)
@@ -334,17 +341,61 @@ class AddTaskThread(QThread):
         except Exception as e:
             self.finished.emit(False, str(e))
 
+class EventStreamThread(QThread):
+    """
+    后台订阅后端的变更推送；断线后按退避间隔重连
+    """
+    event_received = pyqtSignal(str, dict)
+    connection_changed = pyqtSignal(bool)
+
+    def __init__(self, api_client):
+        super().__init__()
+        self.api = api_client
+        self.running = True
+
+    def run(self):
+        delay = 1000
+        while self.running:
+            connected = False
+            try:
+                for event, data in self.api.iter_events():
+                    if event == "hello":
+                        connected = True
+                        delay = 1000
+                        self.connection_changed.emit(True)
+                    self.event_received.emit(event, data)
+                    if not self.running:
+                        break
+            except Exception:
+                pass
+            if connected:
+                self.connection_changed.emit(False)
+            # Back off before reconnecting, staying responsive to stop()
+            waited = 0
+            while self.running and waited < delay:
+                self.msleep(100)
+                waited += 100
+            delay = min(delay * 2, 30000)
+
+    def stop(self):
+        self.running = False
+        self.api.close_event_stream()
+        self.wait(2000)
+
 class TaskWindow(QWidget):
-    def __init__(self):
+    def __init__(self, api_client=None):
         super().__init__()
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.Tool)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         self.resize(360, 600)
         
-        self.api = ApiClient()
+        self.api = api_client or create_api_client()
         self.drag_pos = QPoint()
         self.current_list_id = "default"
         self.current_list_name = "今日任务"
+        # The rows shown: the first pages of the current list, in the backend's open-first order
+        self.tasks = []
+        self.next_cursor = None
         
         self.setup_ui()
         
@@ -353,9 +404,23 @@ class TaskWindow(QWidget):
         
         self.refresh_tasks()
         
+        # Polling is only the fallback for when the push channel is down, and only while visible
         self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(2000)
         self.refresh_timer.timeout.connect(self.refresh_tasks_silent)
-        self.refresh_timer.start(2000)
+        
+        # Bursts of change events collapse into one refetch of the shown rows
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setSingleShot(True)
+        self.sync_timer.setInterval(50)
+        self.sync_timer.timeout.connect(self.refresh_tasks_silent)
+        
+        self.push_connected = False
+        self.event_thread = EventStreamThread(self.api)
+        self.event_thread.event_received.connect(self.on_backend_event)
+        self.event_thread.connection_changed.connect(self.on_push_connection_changed)
+        self.event_thread.start()
+        QApplication.instance().aboutToQuit.connect(self.event_thread.stop)
 
     def setup_ui(self):
         outer_layout = QVBoxLayout()
@@ -413,6 +478,7 @@ class TaskWindow(QWidget):
         self.task_list.setVerticalScrollMode(QListWidget.ScrollMode.ScrollPerPixel)
         self.task_list.setStyleSheet("background: transparent; outline: none;")
         self.task_list.setSpacing(8)
+        self.task_list.verticalScrollBar().valueChanged.connect(self.on_task_list_scrolled)
         
         list_wrapper = QWidget()
         list_layout = QVBoxLayout(list_wrapper)
@@ -498,32 +564,100 @@ class TaskWindow(QWidget):
         self.task_list.addItem(item)
         self.task_list.setItemWidget(item, widget)
 
-    def refresh_tasks(self):
+    def render_tasks(self):
         self.task_list.clear()
-        tasks = self.api.get_tasks(self.current_list_id)
-        tasks.sort(key=lambda x: x['completed'])
-        
+        for t in self.tasks:
+            self.add_item_to_list(t)
+
+    def refresh_tasks(self):
+        # Full reload, back to the first page
+        self.tasks = []
+        self.fetch_tasks()
+        self.render_tasks()
+
+    def fetch_tasks(self) -> bool:
+        """
+        重新读取当前显示的行（至少一页），未完成在前的顺序由后端维护的索引给出，不在本地排序。
+        返回显示的数据是否有变化；没有变化时后端只回 304
+        """
+        limit = min(max(TASK_PAGE_SIZE, len(self.tasks)), MAX_TASK_PAGE)
+        page = self.api.get_task_page(self.current_list_id, order="open_first", limit=limit)
+        if page is None:
+            return False
+        tasks, self.next_cursor = page
+        if tasks == self.tasks:
+            return False
+        self.tasks = tasks
+        return True
+
+    def on_task_list_scrolled(self, value):
+        scroll_bar = self.task_list.verticalScrollBar()
+        if self.next_cursor is None or value < scroll_bar.maximum() - 70:
+            return
+        # Near the bottom: append the next page
+        cursor, self.next_cursor = self.next_cursor, None
+        page = self.api.get_task_page(self.current_list_id, order="open_first", limit=TASK_PAGE_SIZE, cursor=cursor)
+        if page is None:
+            self.next_cursor = cursor
+            return
+        tasks, self.next_cursor = page
+        self.tasks = self.tasks + tasks
         for t in tasks:
             self.add_item_to_list(t)
 
     def refresh_tasks_silent(self):
         try:
-            current_tasks = self.api.get_tasks(self.current_list_id)
-            current_tasks.sort(key=lambda x: x['completed'])
+            if not self.fetch_tasks():
+                return
             
-            if len(current_tasks) != self.task_list.count():
-                self.refresh_tasks()
+            if not self.tasks and self.current_list_id != "default":
+                lists = self.api.get_lists()
+                if lists and all(l['id'] != self.current_list_id for l in lists):
+                    # Deleted elsewhere
+                    QTimer.singleShot(0, lambda: self.switch_list('default', '今日任务'))
+                    return
+            
+            # Only rebuild the widgets when what is shown actually differs
+            if len(self.tasks) != self.task_list.count():
+                self.render_tasks()
                 return
                 
-            for i, t in enumerate(current_tasks):
+            for i, t in enumerate(self.tasks):
                 item = self.task_list.item(i)
                 widget = self.task_list.itemWidget(item)
-                if widget.task_id != t['id'] or widget.checkbox.isChecked() != t['completed']:
-                    self.refresh_tasks()
+                if (widget.task_id != t['id'] or widget.checkbox.isChecked() != t['completed']
+                        or widget.label.text() != t['title']):
+                    self.render_tasks()
                     return
         except:
             pass
 
+    def on_push_connection_changed(self, connected):
+        self.push_connected = connected
+        if connected:
+            self.refresh_timer.stop()
+            # Catch up on anything missed while disconnected
+            self.sync_timer.start()
+        elif self.isVisible():
+            self.refresh_timer.start()
+
+    def on_backend_event(self, event, data):
+        if event != "change":
+            return
+        if data.get("kind") == "task" and data.get("list_id") != self.current_list_id:
+            return
+        if not self.sync_timer.isActive():
+            self.sync_timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.push_connected:
+            self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+
     def add_task(self):
         title = self.task_input.text().strip()
         if not title: return
@@ -545,22 +679,19 @@ class TaskWindow(QWidget):
         if success:
             self.task_input.clear()
             self.input_container.hide()
-            self.refresh_tasks()
+            self.refresh_tasks_silent()
         else:
             QMessageBox.warning(self, "Error", f"Failed to add task: {message}")
 
     def on_task_status_change(self, task_id, completed):
-        for i in range(self.task_list.count()):
-            item = self.task_list.item(i)
-            widget = self.task_list.itemWidget(item)
-            if widget.task_id == task_id:
-                if self.api.update_task(task_id, widget.label.text(), completed, self.current_list_id):
-                    pass
-                break
+        # Only the flag travels, so a concurrent title edit is never overwritten
+        if self.api.patch_task(task_id, {"completed": completed}) is not None:
+            # The task moves between the open and completed rows; re-render outside this card's signal
+            self.sync_timer.start()
 
     def on_task_delete(self, task_id):
         if self.api.delete_task(task_id):
-            self.refresh_tasks()
+            self.refresh_tasks_silent()
 
     def switch_list(self, list_id, list_name):
         self.current_list_id = list_id
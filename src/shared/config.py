@@ -0,0 +1,58 @@
+import os
+import socket
+import sys
+
+from src.shared.paths import get_data_path
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+# 存储引擎：sqlite（默认）或 json（快照 + 追加日志）
+STORAGE_BACKEND = os.environ.get("FLOATDO_STORAGE", "sqlite").lower()
+
+# json 引擎：日志累计多少条操作后压缩回快照
+JOURNAL_COMPACT_THRESHOLD = _env_int("FLOATDO_JOURNAL_COMPACT_THRESHOLD", 1000)
+
+# 延迟写入窗口（毫秒）：窗口内的连续变更合并为一次写入
+WRITE_BEHIND_WINDOW_MS = _env_int("FLOATDO_WRITE_BEHIND_WINDOW_MS", 200)
+
+# 完成超过多少天的任务移入归档（0 表示不归档）
+ARCHIVE_AFTER_DAYS = _env_int("FLOATDO_ARCHIVE_AFTER_DAYS", 7)
+
+# 前端访问后端的方式：embedded（同进程直接调用服务层，不经过 HTTP，默认）、http，
+# 或 process（后端运行在受监护的子进程中，崩溃或无响应时自动重启，前端通过 HTTP 访问）
+BACKEND_MODE = os.environ.get("FLOATDO_BACKEND", "embedded").lower()
+
+# embedded 模式下是否仍启动 HTTP 服务（仅供外部客户端使用；process 模式下由子进程提供 HTTP）
+SERVE_HTTP = _env_int("FLOATDO_SERVE_HTTP", 0) == 1
+
+# 启动耗时跟踪：为 1 时在控制台打印各启动阶段距程序开始运行的毫秒数
+STARTUP_TRACE = _env_int("FLOATDO_STARTUP_TRACE", 0) == 1
+
+# 前后端通信方式：auto（系统支持时用 Unix 域套接字，否则 TCP）、unix 或 tcp
+TRANSPORT = os.environ.get("FLOATDO_TRANSPORT", "auto").lower()
+BACKEND_HOST = "127.0.0.1"
+# TCP 端口，0 表示由系统分配空闲端口（实际端口在后端就绪后交给客户端）
+BACKEND_PORT = _env_int("FLOATDO_PORT", 8000)
+# http 模式下最多等待后端就绪多少毫秒
+BACKEND_READY_TIMEOUT_MS = _env_int("FLOATDO_READY_TIMEOUT_MS", 5000)
+SOCKET_FILE = get_data_path("floatdo.sock")
+
+# sun_path holds about 104 bytes on macOS, 108 on Linux
+_SOCKET_PATH_MAX = 100
+
+def _use_unix_socket() -> bool:
+    if TRANSPORT == "tcp":
+        return False
+    # Windows Python builds have no AF_UNIX, and uvicorn/httpx do not support it there
+    if sys.platform == "win32" or not hasattr(socket, "AF_UNIX"):
+        return False
+    if len(os.fsencode(SOCKET_FILE)) > _SOCKET_PATH_MAX:
+        print(f"Socket path too long, falling back to TCP: {SOCKET_FILE}")
+        return False
+    return True
+
+USE_UNIX_SOCKET = _use_unix_socket()
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, List, Optional
+
+from src.shared.paths import get_data_path
+
+# How long a second launch waits for the running instance to acknowledge its command
+FORWARD_TIMEOUT = 2.0
+# A launch that finds the address held but gets no answer (the other instance is
+# shutting down, or lost a race for it) tries this many times before giving up
+CLAIM_ATTEMPTS = 5
+CLAIM_RETRY_DELAY = 0.2
+MAX_COMMAND_BYTES = 64 * 1024
+
+
+def instance_address():
+    """
+    单实例通信地址：Windows 上是按数据目录命名的命名管道，其他平台是数据目录中的 Unix socket
+    """
+    if sys.platform == "win32":
+        # One instance per data directory, like the data files themselves
+        digest = hashlib.sha1(os.path.normcase(get_data_path()).encode("utf-8")).hexdigest()[:16]
+        return rf"\\.\pipe\floatdo-{digest}", "AF_PIPE"
+    return get_data_path("floatdo-instance.sock"), "AF_UNIX"
+
+
+def command_from_argv(args: List[str]) -> Dict[str, Any]:
+    """
+    把启动参数转换为命令：没有参数时显示任务面板，否则把参数文本作为新任务标题
+    """
+    title = " ".join(args).strip()
+    if title:
+        return {"command": "add", "title": title}
+    return {"command": "show"}
+
+
+def instance_running() -> bool:
+    """
+    是否有实例在监听单实例地址：只连接不发命令，运行中的实例把它当作存活检查
+    """
+    address, family = instance_address()
+    try:
+        Client(address, family).close()
+        return True
+    except (OSError, EOFError):
+        return False
+
+
+def forward_command(command: Dict[str, Any]) -> bool:
+    """
+    把命令发给已在运行的实例；成功返回 True（调用方随后直接退出），没有运行中的实例时返回 False
+    """
+    address, family = instance_address()
+    try:
+        conn = Client(address, family)
+    except (OSError, EOFError):
+        return False
+    try:
+        conn.send_bytes(json.dumps(command).encode("utf-8"))
+        # The reply only confirms receipt; the running instance acts on it in its own UI thread
+        return conn.poll(FORWARD_TIMEOUT) and conn.recv_bytes() == b"ok"
+    except (OSError, EOFError):
+        return False
+    finally:
+        conn.close()
+
+
+class InstanceServer:
+    """
+    运行中的实例持有的本地监听端：占用地址后立即开始接收后续启动转发来的命令，
+    handler 就绪前收到的命令先排队，serve 时再依次交给 handler
+    """
+
+    def __init__(self):
+        self.listener: Optional[Listener] = None
+        self.thread: Optional[threading.Thread] = None
+        self.handler: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.pending: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+
+    def claim(self) -> bool:
+        """
+        占用单实例地址并开始接收命令；已有其他实例在监听时返回 False，地址完全不可用时抛出 OSError
+        """
+        address, family = instance_address()
+        if family == "AF_UNIX":
+            # First run: the socket lives in the data directory, which may not exist yet
+            os.makedirs(os.path.dirname(address), exist_ok=True)
+        try:
+            self.listener = Listener(address, family)
+        except OSError as e:
+            if family != "AF_UNIX":
+                # The pipe is created with FILE_FLAG_FIRST_PIPE_INSTANCE: access denied or
+                # pipe busy means another instance already owns it
+                if getattr(e, "winerror", None) in (5, 231):
+                    return False
+                raise
+            if not os.path.exists(address):
+                raise
+            if instance_running():
+                # Another instance is listening on it
+                return False
+            # Nobody answers on it: the socket file is left over from an instance
+            # that did not shut down cleanly
+            os.unlink(address)
+            self.listener = Listener(address, family)
+        if family == "AF_UNIX":
+            # Connecting needs write permission on the socket file
+            os.chmod(address, 0o600)
+        # Answer right away, even while the UI is still starting: a launch that gets no reply
+        # would otherwise start a second instance
+        self.thread = threading.Thread(target=self._run, args=(self.listener,), name="floatdo-instance", daemon=True)
+        self.thread.start()
+        return True
+
+    def serve(self, handler: Callable[[Dict[str, Any]], None]):
+        """
+        设置命令处理函数，并交出之前排队的命令；handler 在监听线程中调用，需要自行切换到界面线程
+        """
+        with self.lock:
+            self.handler = handler
+            pending, self.pending = self.pending, []
+            for command in pending:
+                handler(command)
+
+    def _dispatch(self, command: Dict[str, Any]):
+        # Under the lock, so queued commands reach the handler before newer ones
+        with self.lock:
+            if self.handler is None:
+                self.pending.append(command)
+            else:
+                self.handler(command)
+
+    def _run(self, listener: Listener):
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                # Closed by close()
+                return
+            try:
+                # JSON rather than Connection.recv(), which would unpickle whatever a local process sends
+                command = json.loads(conn.recv_bytes(MAX_COMMAND_BYTES).decode("utf-8"))
+                conn.send_bytes(b"ok")
+                self._dispatch(command)
+            except EOFError:
+                # Connected without a command: claim() checking that this instance is alive
+                pass
+            except Exception as e:
+                print(f"Error handling forwarded command: {e}")
+            finally:
+                conn.close()
+
+    def close(self):
+        if self.listener is not None:
+            # Also removes the socket file on Unix
+            self.listener.close()
+            self.listener = None
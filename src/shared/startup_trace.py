@@ -0,0 +1,23 @@
+import time
+from typing import List, Tuple
+
+from src.shared.config import STARTUP_TRACE
+
+# Origin of the trace: main.py imports this module before Qt and the backend
+_STARTED = time.perf_counter()
+_marks: List[Tuple[str, float]] = []
+
+
+def mark(label: str) -> float:
+    """
+    记录一个启动阶段完成的时间（距程序开始运行的毫秒数）；FLOATDO_STARTUP_TRACE=1 时同时打印
+    """
+    elapsed = (time.perf_counter() - _STARTED) * 1000
+    _marks.append((label, elapsed))
+    if STARTUP_TRACE:
+        print(f"[startup] {elapsed:8.1f} ms  {label}")
+    return elapsed
+
+
+def marks() -> List[Tuple[str, float]]:
+    return list(_marks)
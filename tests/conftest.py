@@ -0,0 +1,36 @@
+import pytest
+
+from src.backend.archive import TaskArchive
+from src.backend.persistence import WriteBehindPersister
+from src.backend.service import TaskService
+from src.backend.storage import JsonShardStorage, SqliteStorage
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    """
+    在 tmp_path 中创建服务（未启动），多次调用得到读写同一份数据的新实例，用于模拟重启。
+    测试结束时停止所有还在运行的实例
+    """
+    services = []
+
+    def make(engine: str = "sqlite") -> TaskService:
+        if engine == "json":
+            storage = JsonShardStorage(str(tmp_path))
+        else:
+            storage = SqliteStorage(str(tmp_path / "floatdo.db"))
+        # No write-behind window: changes reach storage right away
+        service = TaskService(storage, WriteBehindPersister(storage, 0), TaskArchive(str(tmp_path / "archive.ndjson.gz")))
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.stop()
+
+
+@pytest.fixture
+def service(make_service):
+    service = make_service()
+    service.start()
+    return service
@@ -0,0 +1,80 @@
+import pytest
+from fastapi import HTTPException
+
+from src.backend import main
+
+
+def test_cursor_round_trips_list_ids_with_colons():
+    query = "a:b|None|created|False"
+    cursor = main.encode_cursor(query, (1, 42))
+    assert main.decode_cursor(cursor, query) == (1, 42)
+
+    with pytest.raises(HTTPException) as e:
+        main.decode_cursor(cursor, "a:c|None|created|False")
+    assert e.value.detail == "Cursor expired"
+
+
+@pytest.fixture
+def client(make_service, monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.backend.cache import ResponseCache
+
+    service = make_service()
+    monkeypatch.setattr(main, "service", service)
+    monkeypatch.setattr(main, "store", service.store)
+    monkeypatch.setattr(main, "response_cache", ResponseCache())
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_etag_answers_not_modified_until_a_change(client):
+    response = client.get("/tasks", params={"list_id": "default"})
+    assert response.json() == []
+    etag = response.headers["etag"]
+    response = client.get("/tasks", params={"list_id": "default"}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post("/tasks", json={"id": "a", "title": "milk"})
+    response = client.get("/tasks", params={"list_id": "default"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [t["id"] for t in response.json()] == ["a"]
+    assert response.headers["etag"] != etag
+
+
+def test_cached_responses_follow_mutations(client):
+    lists = client.get("/lists", params={"with_counts": True})
+    assert lists.json()[0]["open"] == 0
+    assert client.get("/tasks").json() == []
+
+    client.post("/tasks", json={"id": "a", "title": "milk"})
+    client.patch("/tasks/a", json={"completed": True})
+    lists = client.get("/lists", params={"with_counts": True}, headers={"If-None-Match": lists.headers["etag"]})
+    assert (lists.json()[0]["open"], lists.json()[0]["completed"]) == (0, 1)
+    assert [t["completed"] for t in client.get("/tasks").json()] == [True]
+
+    client.post("/lists", json={"id": "work", "name": "工作"})
+    client.delete("/tasks/a")
+    assert [l["id"] for l in client.get("/lists").json()] == ["default", "work"]
+    assert client.get("/tasks").json() == []
+
+
+def test_reads_with_a_snapshot_do_not_wait_for_the_writer(client):
+    import threading
+    import time
+
+    main.service.create_task({"id": "a", "title": "milk", "completed": False, "list_id": "default"})
+    main.service.get_tasks("default")
+    main.service.get_lists()
+    # Hold the writer busy; release it after a while in case the request does queue behind it
+    gate = threading.Event()
+    main.service.submit(gate.wait)
+    release = threading.Timer(2, gate.set)
+    release.start()
+    try:
+        start = time.perf_counter()
+        assert [t["id"] for t in client.get("/tasks", params={"list_id": "default"}).json()] == ["a"]
+        assert [l["id"] for l in client.get("/lists").json()] == ["default"]
+        assert time.perf_counter() - start < 1
+    finally:
+        gate.set()
+        release.cancel()
@@ -0,0 +1,52 @@
+import os
+import socket
+import stat
+import sys
+import time
+
+import pytest
+
+from src.shared import instance
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Unix socket layout")
+
+
+@pytest.fixture
+def address(tmp_path, monkeypatch):
+    path = str(tmp_path / "floatdo-instance.sock")
+    monkeypatch.setattr(instance, "instance_address", lambda: (path, "AF_UNIX"))
+    return path
+
+
+def test_commands_before_serve_are_queued(address):
+    first = instance.InstanceServer()
+    assert first.claim()
+    try:
+        assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+        # The UI is not up yet, but the launch is answered at once
+        started = time.perf_counter()
+        assert instance.forward_command({"command": "add", "title": "milk"})
+        assert time.perf_counter() - started < 0.5
+        assert not instance.InstanceServer().claim()
+
+        received = []
+        instance.forward_command({"command": "show"})
+        deadline = time.monotonic() + 2
+        while len(first.pending) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        first.serve(received.append)
+        assert received == [{"command": "add", "title": "milk"}, {"command": "show"}]
+    finally:
+        first.close()
+    assert not os.path.exists(address)
+
+
+def test_stale_socket_is_replaced(address):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(address)
+    stale.close()
+    assert not instance.forward_command({"command": "show"})
+
+    server = instance.InstanceServer()
+    assert server.claim()
+    server.close()
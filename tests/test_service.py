@@ -0,0 +1,232 @@
+import pytest
+
+from src.backend.service import ServiceError
+
+ENGINES = ("sqlite", "json")
+
+
+def add(service, task_id, title="task", list_id="default"):
+    return service.create_task({"id": task_id, "title": title, "completed": False, "list_id": list_id})
+
+
+def test_update_cannot_take_an_existing_id(service):
+    add(service, "a")
+    add(service, "b")
+    with pytest.raises(ServiceError) as e:
+        service.update_task("a", {"id": "b", "title": "a", "completed": False, "list_id": "default"})
+    assert e.value.status_code == 400
+
+    service.delete_task("b")
+    assert [t["id"] for t in service.get_tasks("default")] == ["a"]
+    counts = {l["id"]: (l["open"], l["completed"]) for l in service.get_lists(with_counts=True)}
+    assert counts["default"] == (1, 0)
+
+
+def test_start_survives_a_failing_archive_sweep(make_service):
+    service = make_service()
+
+    def fail():
+        raise OSError("disk full")
+
+    service.archive_completed_tasks = fail
+    assert service.start()
+    assert service.writer_alive()
+    add(service, "a")
+    assert [t["id"] for t in service.get_tasks("default")] == ["a"]
+
+
+def test_failing_listener_does_not_lose_the_change(make_service, service):
+    def broken(event):
+        raise RuntimeError("Event loop is closed")
+
+    service.add_listener(broken)
+    add(service, "a")
+    service.stop()
+
+    restarted = make_service()
+    restarted.start()
+    assert [t["id"] for t in restarted.get_tasks("default")] == ["a"]
+
+
+def test_batch_update_cannot_take_an_existing_id(service):
+    add(service, "t0")
+    add(service, "t1")
+    result = service.batch([
+        {"op": "update", "id": "t0", "task": {"id": "t1", "title": "t0", "completed": False, "list_id": "default"}},
+    ])
+    assert result["status"] == "error"
+    assert result["results"][0]["detail"] == "Task ID already exists"
+
+    # Freed earlier in the same batch, the id may be taken
+    result = service.batch([
+        {"op": "delete", "id": "t1"},
+        {"op": "update", "id": "t0", "task": {"id": "t1", "title": "t0", "completed": False, "list_id": "default"}},
+    ])
+    assert result["status"] == "success"
+    page, _ = service.query_tasks("default", None, False, False, None, 10)
+    assert [t["id"] for t in page] == ["t1"]
+
+
+def test_bad_import_line_is_reported_and_restart_works(make_service, service):
+    from src.backend.transfer import ImportReport, iter_chunks
+
+    lines = [
+        '{"type":"task","id":"a","title":"ok","completed":true,"completed_at":1}\n',
+        '{"type":"task","id":"b","title":"bad","completed":true,"completed_at":"yesterday"}\n',
+    ]
+    report = ImportReport()
+    state = {"archived_ids": None}
+    for chunk in iter_chunks(lines, report):
+        service.import_chunk(chunk, report, state)
+    assert report.error_count == 1
+    service.stop()
+
+    assert make_service().start()
+
+
+def test_writer_methods_take_keyword_arguments(service):
+    add(service, "a", "milk")
+    service.patch_task("a", fields={"completed": True})
+    assert service.search("milk", list_id="default")["total"] == 1
+    page, _ = service.query_tasks("default", completed=True, limit=10)
+    assert [t["id"] for t in page] == ["a"]
+
+
+def test_task_edited_while_archiving_stays_hot_and_leaves_the_archive(service):
+    for task_id in ("old", "edited"):
+        service.create_task({"id": task_id, "title": task_id, "completed": True, "list_id": "default", "completed_at": 1})
+    append = service.archive.append
+
+    def append_then_edit(tasks):
+        append(tasks)
+        service.patch_task("edited", {"title": "changed"})
+
+    service.archive.append = append_then_edit
+    assert service.archive_completed_tasks() == 1
+
+    assert [t["id"] for t in service.archive.iter_tasks()] == ["old"]
+    assert [t["title"] for t in service.get_tasks("default")] == ["changed"]
+
+    # Still stale: the next sweep archives it once
+    service.archive.append = append
+    assert service.archive_completed_tasks() == 1
+    assert sorted(t["id"] for t in service.archive.iter_tasks()) == ["edited", "old"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_patch_writes_only_the_changed_fields(make_service, engine):
+    service = make_service(engine)
+    service.start()
+    add(service, "a", "milk")
+    service.persister.flush()
+    written = []
+    apply = service.storage.apply
+
+    def record(ops):
+        written.extend(ops)
+        apply(ops)
+
+    service.storage.apply = record
+    service.patch_task("a", {"completed": True})
+    service.persister.flush()
+    assert [(op["op"], sorted(op["fields"])) for op in written] == [("patch_task", ["completed", "completed_at"])]
+    service.stop()
+
+    restarted = make_service(engine)
+    restarted.start()
+    task = restarted.get_tasks("default")[0]
+    assert (task["title"], task["completed"]) == ("milk", True)
+    assert task["completed_at"] is not None
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_counts_of_unloaded_and_loaded_lists(make_service, engine):
+    service = make_service(engine)
+    service.start()
+    service.create_list({"id": "work", "name": "工作"})
+    add(service, "w1", list_id="work")
+    add(service, "w2", list_id="work")
+    service.patch_task("w2", {"completed": True})
+    service.stop()
+
+    def counts(service):
+        return {l["id"]: (l["open"], l["completed"]) for l in service.get_lists(with_counts=True)}
+
+    restarted = make_service(engine)
+    restarted.start()
+    # Counted in storage, without loading the list
+    assert counts(restarted) == {"default": (0, 0), "work": (1, 1)}
+    assert not restarted.store.is_loaded("work")
+
+    add(restarted, "w3", list_id="work")
+    assert restarted.store.is_loaded("work")
+    assert counts(restarted) == {"default": (0, 0), "work": (2, 1)}
+    restarted.delete_task("w2")
+    assert counts(restarted) == {"default": (0, 0), "work": (2, 0)}
+
+
+def test_search_covers_loaded_lists_until_the_rest_load(make_service, monkeypatch):
+    from src.backend import service as service_module
+
+    service = make_service()
+    service.start()
+    service.create_list({"id": "work", "name": "工作"})
+    add(service, "a", "买牛奶")
+    add(service, "b", "牛奶发票", list_id="work")
+    service.stop()
+
+    # Keep the background load from running on its own
+    monkeypatch.setattr(service_module, "PRELOAD_DELAY", 3600)
+    restarted = make_service()
+    restarted.start()
+    result = restarted.search("牛奶")
+    assert ([t["id"] for t in result["tasks"]], result["incomplete"]) == (["a"], True)
+    # Searching does not pull the list in
+    assert not restarted.store.is_loaded("work")
+
+    while restarted._load_next_list():
+        pass
+    result = restarted.search("牛奶")
+    assert (sorted(t["id"] for t in result["tasks"]), result["incomplete"]) == (["a", "b"], False)
+
+
+def test_remaining_lists_load_in_the_background(make_service, monkeypatch):
+    from src.backend import service as service_module
+
+    service = make_service()
+    service.start()
+    service.create_list({"id": "work", "name": "工作"})
+    service.stop()
+
+    monkeypatch.setattr(service_module, "PRELOAD_DELAY", 0)
+    restarted = make_service()
+    restarted.start()
+    restarted.preloader.join(5)
+    assert restarted.store.unloaded_lists() == []
+
+
+@pytest.mark.parametrize("task, detail", [
+    ({"id": "b"}, "Missing or invalid title"),
+    ({"id": "b", "title": "x", "completed": "yes"}, "Invalid completed"),
+    ({"id": "b", "title": "x", "list_id": None}, "Invalid list_id"),
+    ({"id": 7, "title": "x"}, "Missing or invalid id"),
+])
+def test_batch_rejects_mistyped_tasks_before_applying_any(service, task, detail):
+    result = service.batch([
+        {"op": "create", "task": {"id": "a", "title": "x"}},
+        {"op": "create", "task": task},
+    ])
+    assert result["status"] == "error"
+    assert [r["status"] for r in result["results"]] == ["ok", "error"]
+    assert result["results"][1]["detail"] == detail
+    assert service.get_tasks("default") == []
+
+
+def test_only_single_list_views_are_kept(service):
+    add(service, "a")
+    assert [t["id"] for t in service.get_tasks()] == ["a"]
+    assert [t["id"] for t in service.get_tasks("default")] == ["a"]
+    assert ("tasks", None) not in service.views
+    assert service.cached_tasks("default") is not None
+    add(service, "b")
+    assert service.cached_tasks("default") is None
@@ -0,0 +1,49 @@
+import os
+
+from src.backend.storage import JsonShardStorage
+
+
+def put(task_id, list_id):
+    return {"op": "put_task", "task": {"id": task_id, "title": task_id, "completed": False, "list_id": list_id}}
+
+
+def reopen(tmp_path):
+    # A tiny threshold, so the id index gets compacted along the way
+    storage = JsonShardStorage(str(tmp_path), 2)
+    storage.open()
+    return storage
+
+
+def test_shard_lookup_reads_the_id_index_not_the_shards(tmp_path):
+    storage = reopen(tmp_path)
+    storage.apply([{"op": "put_list", "list": {"id": "work", "name": "work"}}, put("a", "default"), put("b", "work")])
+    # Moved, then the old list deleted: the move must survive the cascade
+    storage.apply([{"op": "delete_task", "id": "b", "list_id": "work"}, put("b", "default"), put("c", "work")])
+    storage.apply([{"op": "delete_list", "id": "work"}])
+    storage.close()
+
+    storage = reopen(tmp_path)
+    assert storage.locate_task("a") == "default"
+    assert storage.locate_task("b") == "default"
+    assert storage.locate_task("c") is None
+    assert storage.locate_task("new") is None
+    # Answered from the index file alone
+    assert storage.shards == {}
+    storage.close()
+
+
+def test_shard_data_without_an_index_gets_one_built(tmp_path):
+    storage = reopen(tmp_path)
+    storage.apply([put("a", "default")])
+    storage.close()
+    os.remove(storage.index_file)
+
+    storage = reopen(tmp_path)
+    assert storage.locate_task("a") == "default"
+    storage.apply([put("b", "other")])
+    storage.close()
+
+    storage = reopen(tmp_path)
+    assert storage.locate_task("b") == "other"
+    assert storage.shards == {}
+    storage.close()
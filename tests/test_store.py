@@ -0,0 +1,101 @@
+from src.backend.store import TaskStore, TaskRecord, ListRecord
+
+
+def make_store():
+    store = TaskStore()
+    store.load([{"id": "default", "name": "今日任务"}, {"id": "work", "name": "工作"}])
+    return store
+
+
+def check_indexes(store):
+    """
+    id 索引、清单索引、状态索引和计数器必须描述同一组任务
+    """
+    by_list = {}
+    for task_id, task in store.tasks.items():
+        assert task.id == task_id
+        by_list.setdefault(task.list_id, []).append(task)
+    assert set(store.list_index) == set(by_list)
+    for list_id, tasks in by_list.items():
+        assert set(store.list_index[list_id]) == {t.id for t in tasks}
+        open_run, done_run = store.status_index[list_id]
+        assert open_run.ids == [t.id for t in sorted(tasks, key=lambda t: t.position) if not t.completed]
+        assert done_run.ids == [t.id for t in sorted(tasks, key=lambda t: t.position) if t.completed]
+        done = sum(1 for t in tasks if t.completed)
+        assert store.counts[list_id] == [len(tasks) - done, done]
+    for list_id in store.counts.keys() - by_list.keys():
+        assert store.counts[list_id] == [0, 0]
+
+
+def test_mutations_keep_indexes_consistent():
+    store = make_store()
+    for i in range(5):
+        store.add_task(TaskRecord(f"t{i}", f"task {i}"))
+    check_indexes(store)
+
+    store.replace_task("t1", TaskRecord("t1", "done", completed=True))
+    store.replace_task("t2", TaskRecord("t2", "moved", list_id="work"))
+    store.replace_task("t3", TaskRecord("t3b", "renamed"))
+    store.remove_task("t0")
+    check_indexes(store)
+    assert [t.id for t in store.tasks_in_list("default")] == ["t1", "t4", "t3b"]
+    assert store.list_counts() == {"default": (2, 1), "work": (1, 0)}
+
+
+def test_recreated_list_starts_empty():
+    stored = {"work": [{"id": "old", "title": "old", "list_id": "work"}]}
+    store = TaskStore(loader=lambda list_id: stored.get(list_id, []))
+    store.load([{"id": "default", "name": "今日任务"}, {"id": "work", "name": "工作"}])
+    assert [t.id for t in store.tasks_in_list("work")] == ["old"]
+
+    # The delete has not reached storage yet when the list comes back
+    store.remove_list("work")
+    store.add_list(ListRecord("work", "工作"))
+    assert store.tasks_in_list("work") == []
+    check_indexes(store)
+
+
+def test_changes_since_reports_changes_and_tombstones():
+    store = make_store()
+    for i in range(3):
+        store.add_task(TaskRecord(f"t{i}", f"task {i}"))
+    since = store.revision
+    store.remove_task("t0")
+    store.replace_task("t1", TaskRecord("t1", "moved", list_id="work"))
+    store.replace_task("t2", TaskRecord("t2", "edited"))
+
+    changes = store.changes_since(since, store.epoch)
+    assert not changes["reset"]
+    assert [t["id"] for t in changes["tasks"]] == ["t1", "t2"]
+    assert changes["deleted"] == ["t0"]
+
+    # The list a task moved out of sees it as deleted
+    changes = store.changes_since(since, store.epoch, "default")
+    assert [t["id"] for t in changes["tasks"]] == ["t2"]
+    assert sorted(changes["deleted"]) == ["t0", "t1"]
+
+    since = store.revision
+    store.remove_list("work")
+    changes = store.changes_since(since, store.epoch)
+    assert changes["deleted_lists"] == ["work"]
+    assert store.changes_since(store.revision, store.epoch)["tasks"] == []
+
+
+def test_changes_since_resets_when_it_cannot_answer(monkeypatch):
+    from src.backend import store as store_module
+
+    monkeypatch.setattr(store_module, "CHANGELOG_LIMIT", 2)
+    store = make_store()
+    since = store.revision
+    for i in range(4):
+        store.add_task(TaskRecord(f"t{i}", f"task {i}"))
+
+    # Older than the trimmed log, another process's epoch, or ahead of this one
+    for args in ((since, store.epoch), (store.revision, "other"), (store.revision + 1, store.epoch), (0, None)):
+        changes = store.changes_since(*args)
+        assert changes["reset"]
+        assert [t["id"] for t in changes["tasks"]] == ["t0", "t1", "t2", "t3"]
+
+    changes = store.changes_since(store.revision - 2, store.epoch)
+    assert not changes["reset"]
+    assert [t["id"] for t in changes["tasks"]] == ["t2", "t3"]
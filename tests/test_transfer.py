@@ -0,0 +1,63 @@
+import io
+import json
+
+import pytest
+
+from src.backend.transfer import decode_record
+
+
+def test_decode_task():
+    kind, record = decode_record('{"type":"task","id":"a","title":"x","completed":true,"completed_at":1700000000.5}')
+    assert kind == "task"
+    assert record == {"id": "a", "title": "x", "completed": True, "list_id": "default", "completed_at": 1700000000.5}
+
+
+@pytest.mark.parametrize("fields", [
+    '"completed":"false"',
+    '"completed":1',
+    '"completed":true,"completed_at":"yesterday"',
+    '"completed":true,"completed_at":true',
+])
+def test_decode_rejects_mistyped_task_fields(fields):
+    with pytest.raises(ValueError):
+        decode_record('{"type":"task","id":"a","title":"x",' + fields + '}')
+
+
+@pytest.mark.parametrize("engine", ("sqlite", "json"))
+def test_export_keeps_tasks_of_lists_that_do_not_exist(make_service, engine):
+    from src.backend.transfer import export_lines, export_offline
+
+    def exported_ids(lines):
+        return sorted(json.loads(line)["id"] for line in lines if json.loads(line)["type"] == "task")
+
+    service = make_service(engine)
+    service.start()
+    service.create_task({"id": "a", "title": "a", "completed": False, "list_id": "default"})
+    service.create_task({"id": "b", "title": "b", "completed": False, "list_id": "ghost"})
+    assert exported_ids(export_lines(*service.export_source(False))) == ["a", "b"]
+    service.stop()
+
+    # Not loaded after a restart: read from storage
+    restarted = make_service(engine)
+    restarted.start()
+    assert exported_ids(export_lines(*restarted.export_source(False))) == ["a", "b"]
+    restarted.stop()
+
+    out = io.StringIO()
+    restarted.storage.open()
+    try:
+        export_offline(restarted.storage, restarted.archive, out, False)
+    finally:
+        restarted.storage.close()
+    assert exported_ids(out.getvalue().splitlines()) == ["a", "b"]
+
+
+def test_offline_cli_refuses_while_the_app_runs(tmp_path, monkeypatch, capsys):
+    from src.backend import transfer
+    from src.shared import instance
+
+    monkeypatch.setattr(instance, "instance_running", lambda: True)
+    out = tmp_path / "backup.ndjson"
+    assert transfer.main(["export", str(out)]) == 1
+    assert not out.exists()
+    assert "FloatDo" in capsys.readouterr().err